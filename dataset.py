@@ -1,6 +1,6 @@
 import argparse
 
-from src.datasets import DatasetBuilder, DatasetSummary, DatasetVerifier
+from src.datasets import DatasetBenchmark, DatasetBuilder, DatasetConverter, DatasetSummary, DatasetVerifier
 
 
 class DatasetCLI:
@@ -12,12 +12,34 @@ class DatasetCLI:
         build_parser = subparsers.add_parser("build", help="Build benchmark datasets")
         build_parser.add_argument("--language", type=str, default=None)
         build_parser.add_argument("--min", type=int, default=20, dest="min_count")
+        build_parser.add_argument("--max-memory", type=int, default=512,
+                                  help="MB of submissions buffered before spilling to disk")
+        build_parser.add_argument("--problems", type=str, default=None, dest="problems_path",
+                                  help="Local problems parquet file(s) instead of open-r1/codeforces")
+        build_parser.add_argument("--submissions", type=str, default=None, dest="submissions_path",
+                                  help="Local submissions parquet file(s) instead of open-r1/codeforces-submissions")
 
         verify_parser = subparsers.add_parser("verify", help="Verify benchmark verdicts")
-        verify_parser.add_argument("--problem", type=str, default=None)
+        verify_parser.add_argument("--problem", type=str, nargs="+", action="extend", default=None, dest="problems",
+                                   help="Problem IDs or shell patterns (e.g. 1791_* ) to verify; repeatable")
+        verify_parser.add_argument("--workers", type=int, default=None,
+                                   help="Processes in the shared execution pool (default: CPU count)")
+        verify_parser.add_argument("--restart", action="store_true", default=False,
+                                   help="Discard the checkpoint and verify every submission again")
 
         subparsers.add_parser("summary", help="Show benchmark dataset summary")
 
+        convert_parser = subparsers.add_parser("convert", help="Import dataset.json files into dataset.db stores")
+        convert_parser.add_argument("--remove", action="store_true", default=False,
+                                    help="Delete each dataset.json once imported")
+
+        bench_parser = subparsers.add_parser("bench", help="Measure build throughput on a synthetic fixture")
+        bench_parser.add_argument("--rows", type=int, default=200_000)
+        bench_parser.add_argument("--problems", type=int, default=40)
+        bench_parser.add_argument("--code-len", type=int, default=500)
+        bench_parser.add_argument("--language", type=str, default=None)
+        bench_parser.add_argument("--max-memory", type=int, default=512)
+
         return parser
 
     @classmethod
@@ -29,12 +51,17 @@ class DatasetCLI:
             DatasetBuilder.run(
                 language=args.language,
                 min_count=args.min_count,
+                max_memory=args.max_memory,
+                problems_path=args.problems_path,
+                submissions_path=args.submissions_path,
             )
             return
 
         if args.command == "verify":
             DatasetVerifier.run(
-                problem=args.problem,
+                problems=args.problems,
+                workers=args.workers,
+                restart=args.restart,
             )
             return
 
@@ -42,6 +69,22 @@ class DatasetCLI:
             DatasetSummary.run()
             return
 
+        if args.command == "convert":
+            DatasetConverter.run(
+                remove=args.remove,
+            )
+            return
+
+        if args.command == "bench":
+            DatasetBenchmark.run(
+                rows=args.rows,
+                problems=args.problems,
+                code_len=args.code_len,
+                language=args.language,
+                max_memory=args.max_memory,
+            )
+            return
+
 
 if __name__ == "__main__":
     DatasetCLI.run()
@@ -1,13 +1,13 @@
 import os
-import glob
 import argparse
 
 from src.approaches import Experiments
+from src.utils import DatasetStore
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument('-d', '--dataset', type=str, required=True,
-                        help="Path to dataset directory or JSON file")
+                        help="Path to dataset directory, dataset.db or JSON file")
     parser.add_argument('-a', '--approach', type=str, default="MooRepair",
                         choices=["PaREL", "Random", "MooRepair"],
                         help="Approach to run (default: MooRepair)")
@@ -23,16 +23,68 @@ if __name__ == "__main__":
                         help="Use 10%% sampling of buggy programs")
     parser.add_argument('-r', '--reset', action='store_true', default=False,
                         help="Reset overall.csv before running experiments")
+    parser.add_argument('--screening', type=str, default="deprioritize",
+                        choices=["reject", "deprioritize", "off"],
+                        help="Static pre-screening of candidates before execution (default: deprioritize)")
+    parser.add_argument('--budget-llm', type=int, default=None,
+                        help="Hard cap on LLM calls for the whole run (default: unlimited)")
+    parser.add_argument('--budget-cpu', type=float, default=None,
+                        help="Hard cap on execution CPU-seconds for the whole run (default: unlimited)")
+    parser.add_argument('--eta', type=int, default=1,
+                        help="Successive-halving factor across buggy programs; 1 disables halving (default: 1)")
+    parser.add_argument('--patience', type=int, default=0,
+                        help="Stop a buggy after this many generations without hypervolume gain; 0 disables (default: 0)")
+    parser.add_argument('--tolerance', type=float, default=1e-3,
+                        help="Relative hypervolume gain counted as progress (default: 1e-3)")
+    parser.add_argument('--llm-cache', type=str, default="off",
+                        choices=["off", "record", "replay", "read"],
+                        help="LLM response cache: record, replay-only (offline) or read-through (default: off)")
+    parser.add_argument('--llm-cache-path', type=str, default=".cache/llm.sqlite",
+                        help="LLM response cache file (default: .cache/llm.sqlite)")
+    parser.add_argument('--llm-concurrency', type=int, default=16,
+                        help="Maximum in-flight LLM requests (default: 16)")
+    parser.add_argument('--llm-rpm', type=int, default=None,
+                        help="LLM requests-per-minute limit (default: unlimited)")
+    parser.add_argument('--llm-tpm', type=int, default=None,
+                        help="LLM prompt tokens-per-minute limit (default: unlimited)")
+    parser.add_argument('--llm-retries', type=int, default=4,
+                        help="Retries on rate-limit/timeout/server errors (default: 4)")
+    parser.add_argument('--backend', type=str, default="openai",
+                        choices=["openai", "local", "mock"],
+                        help="LLM backend: OpenAI API, OpenAI-compatible local server, or offline mock (default: openai)")
+    parser.add_argument('--base-url', type=str, default=None,
+                        help="Base URL of the OpenAI-compatible server for --backend local")
+    parser.add_argument('--mock-latency', type=float, default=0.0,
+                        help="Median latency (s) of the mock backend (default: 0)")
+    parser.add_argument('--mock-failure', type=float, default=0.0,
+                        help="Transient failure rate of the mock backend (default: 0)")
+    parser.add_argument('--mock-mutate', type=float, default=0.0,
+                        help="Rate at which the mock backend mutates the code it returns (default: 0)")
+    parser.add_argument('--llm-stream', action='store_true', default=False,
+                        help="Stream completions and stop as soon as the code block is closed")
+    parser.add_argument('--llm-hedge', type=float, default=None,
+                        help="Send a duplicate request when a call outlives this latency percentile, e.g. 95 (default: off)")
+    parser.add_argument('--llm-hedge-ratio', type=float, default=0.1,
+                        help="Maximum extra requests from hedging, as a fraction of all requests (default: 0.1)")
+    parser.add_argument('--prompt-budget', type=int, default=None,
+                        help="Prompt token budget; longer prompts get compacted profiles/test payloads (default: context window - 4096)")
+    parser.add_argument('--ref-workers', type=int, default=None,
+                        help="Worker processes for PaREL reference ranking (default: CPU count)")
     args = parser.parse_args()
 
     assert os.path.isfile(args.dataset) or os.path.isdir(args.dataset), \
         "Dataset path does not exist"
     assert args.generations > 0, "Generations must be a positive integer"
     assert args.popsize > 0, "Population size must be a positive integer"
+    assert args.eta > 0, "Halving factor must be a positive integer"
+    assert args.patience >= 0, "Patience must be a non-negative integer"
+    assert args.llm_concurrency > 0, "LLM concurrency must be a positive integer"
+    assert args.ref_workers is None or args.ref_workers > 0, "Reference workers must be a positive integer"
+    assert args.llm_hedge is None or 0 < args.llm_hedge < 100, "Hedge percentile must be in (0, 100)"
 
     problems = []
     if os.path.isdir(args.dataset):
-        problems = glob.glob(os.path.join(args.dataset, '**', '*.json'), recursive=True)
+        problems = DatasetStore.find(args.dataset)
     else:
         problems.append(args.dataset)
 
@@ -43,6 +95,30 @@ if __name__ == "__main__":
         llm=args.llm,
         temperature=args.temperature,
         sampling=args.sampling,
-        reset=args.reset
+        reset=args.reset,
+        screening=args.screening,
+        llm_budget=args.budget_llm,
+        cpu_budget=args.budget_cpu,
+        eta=args.eta,
+        patience=args.patience,
+        tolerance=args.tolerance,
+        cache_mode=args.llm_cache,
+        cache_path=args.llm_cache_path,
+        llm_concurrency=args.llm_concurrency,
+        llm_rpm=args.llm_rpm,
+        llm_tpm=args.llm_tpm,
+        llm_retries=args.llm_retries,
+        backend=args.backend,
+        base_url=args.base_url,
+        mock={
+            "latency": args.mock_latency,
+            "failure_rate": args.mock_failure,
+            "mutate_rate": args.mock_mutate,
+        },
+        prompt_budget=args.prompt_budget,
+        stream=args.llm_stream,
+        hedge=args.llm_hedge,
+        hedge_ratio=args.llm_hedge_ratio,
+        ref_workers=args.ref_workers,
     )
     ex.run(problems)
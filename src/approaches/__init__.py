@@ -1,3 +1,4 @@
 from .experiments import Experiments
 from .parel import PaREffiLearner
-from .moorepair import MooRepair
\ No newline at end of file
+from .moorepair import MooRepair
+from .scheduler import BudgetScheduler, RepairState
\ No newline at end of file
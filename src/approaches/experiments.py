@@ -1,5 +1,6 @@
 import os
 import csv
+import time
 from tqdm import tqdm
 from prettytable import PrettyTable
 import warnings
@@ -7,10 +8,11 @@ warnings.filterwarnings('ignore')
 
 from .moorepair import MooRepair
 from .parel import PaREffiLearner
-from src.llms import Models, Tokenizer
+from .scheduler import BudgetScheduler
+from src.llms import Models, Tokenizer, PromptBudget, Telemetry
 from src.genetic import Selection
 from src.utils import ETC, Loader
-from src.execution import Tester, Programs
+from src.execution import Tester, Programs, Baselines
 
 
 OVERALL_PATH = "overall.csv"
@@ -20,6 +22,18 @@ OVERALL_COLS = [
     "ET(s)", "MU(MB)", "TMU(MB*s)",
     "ΔET(%)", "ΔMU(%)", "ΔTMU(%)",
 ]
+HV_PATH = "hypervolume.csv"
+HV_COLS = [
+    "ProblemID", "LLM", "Approach", "BuggyID", "Verdict",
+    "#Gen", "HV", "#LLM", "#Archive",
+]
+TELEMETRY_PATH = "telemetry.csv"
+TELEMETRY_COLS = [
+    "ProblemID", "LLM", "Approach", "BuggyID", "Gen", "Prompt",
+    "#Calls", "#CachedSamples", "#Failed", "#Attempts", "#Samples", "#Empty", "#Discarded",
+    "Latency(s)", "MaxLatency(s)", "QueueWait(s)",
+    "PromptTokens", "CachedTokens", "CompletionTokens", "Cost($)",
+]
 
 
 class Experiments:
@@ -27,7 +41,14 @@ class Experiments:
         approach:str="moorepair", sampling:bool=False, 
         generations:int=4, pop_size:int=6,
         llm:str="gpt-3.5-turbo", temperature:float=0.8, 
-        reset:bool=False
+        reset:bool=False, screening:str="deprioritize",
+        llm_budget:int|None=None, cpu_budget:float|None=None, eta:int=1,
+        patience:int=0, tolerance:float=1e-3,
+        cache_mode:str="off", cache_path:str=".cache/llm.sqlite",
+        llm_concurrency:int=16, llm_rpm:int|None=None, llm_tpm:int|None=None,
+        llm_retries:int=4, backend:str="openai", base_url:str|None=None,
+        mock:dict|None=None, prompt_budget:int|None=None, stream:bool=False,
+        hedge:float|None=None, hedge_ratio:float=0.1, ref_workers:int|None=None
     ):
         self.loader = Loader(sampling)
 
@@ -35,11 +56,25 @@ class Experiments:
         self.generations = generations
         self.pop_size = pop_size
         self.llm = llm
-        Models.set(model=llm, temperature=temperature)
-        if not llm.startswith("gpt-"):
-            Tokenizer.set(llm)
-        if reset and os.path.exists(OVERALL_PATH):
-            os.remove(OVERALL_PATH)
+        self.screening = screening
+        self.patience = patience
+        self.tolerance = tolerance
+        self.ref_workers = ref_workers
+        self.selection = {}  # #references -> per-buggy reference-selection seconds
+        Models.set(model=llm, temperature=temperature,
+                   cache_mode=cache_mode, cache_path=cache_path,
+                   max_concurrency=llm_concurrency, rpm=llm_rpm, tpm=llm_tpm,
+                   max_retries=llm_retries, backend=backend,
+                   base_url=base_url, mock=mock, stream=stream,
+                   hedge=hedge, hedge_ratio=hedge_ratio)
+        # Loaded lazily on the first count; the mock backend only needs estimates
+        Tokenizer.set(llm if backend != "mock" else None)
+        PromptBudget.set(llm, prompt_budget)
+        if reset:
+            for path in (OVERALL_PATH, HV_PATH, TELEMETRY_PATH):
+                if os.path.exists(path):
+                    os.remove(path)
+        self.scheduler = BudgetScheduler(llm_budget, cpu_budget, eta)
 
     def __save(self, problemId: str, buggys: Programs, results: dict):
         """Compute per-verdict stats and append to overall.csv."""
@@ -61,16 +96,17 @@ class Experiments:
             for k in keys
         }
 
+        # Buggy ET/MU/TMU come from the stored baselines when `dataset.py verify` measured them
+        baseline = Baselines.table(
+            [buggys.get_prog_by_id(b_id) for b_id, gen_result in results.items() if gen_result],
+            "buggys")
         for b_id, gen_result in tqdm(results.items(), desc="Save", leave=False):
             if not gen_result:
                 continue
             buggy = buggys.get_prog_by_id(b_id)
             v = buggy.meta.get("verdict", "UNKNOWN")
 
-            buggy_results = Tester.run(buggy)
-            buggy_et  = buggy_results.ET()
-            buggy_mu  = buggy_results.MU()
-            buggy_tmu = buggy_results.TMU()
+            buggy_et, buggy_mu, buggy_tmu = baseline.metrics(b_id)
 
             for gen in range(1, N):
                 patches = gen_result.get(gen, [])
@@ -162,6 +198,105 @@ class Experiments:
                 writer.writerow(OVERALL_COLS)
             writer.writerows(rows)
 
+    def __save_hypervolume(self, problemId: str, buggys: Programs, hypervolumes: dict):
+        """Append per-generation archive hypervolume and cumulative LLM calls to hypervolume.csv."""
+        rows = []
+        for b_id, log in hypervolumes.items():
+            v = buggys.get_prog_by_id(b_id).meta.get("verdict", "UNKNOWN")
+            for gen, hv, calls, size in log:
+                rows.append([problemId, self.llm, self.approach, b_id, v,
+                             gen, f"{hv:.6f}", calls, size])
+
+        file_exists = os.path.exists(HV_PATH) and os.path.getsize(HV_PATH) > 0
+        with open(HV_PATH, mode="a", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            if not file_exists:
+                writer.writerow(HV_COLS)
+            writer.writerows(rows)
+
+    def __save_telemetry(self, problemId: str) -> list[dict]:
+        """Append per (buggy, gen, prompt type) LLM telemetry to telemetry.csv."""
+        groups = Telemetry.aggregate()
+        rows = [[
+            problemId, self.llm, self.approach, g["buggy"], g["gen"], g["prompt_type"],
+            g["calls"], g["cached"], g["failed"], g["attempts"], g["samples"], g["empty"], g["discarded"],
+            f"{g['latency']:.3f}", f"{g['latency_max']:.3f}", f"{g['queue_wait']:.3f}",
+            g["prompt_tokens"], g["cached_tokens"], g["completion_tokens"], f"{g['cost']:.6f}",
+        ] for g in groups]
+
+        file_exists = os.path.exists(TELEMETRY_PATH) and os.path.getsize(TELEMETRY_PATH) > 0
+        with open(TELEMETRY_PATH, mode="a", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            if not file_exists:
+                writer.writerow(TELEMETRY_COLS)
+            writer.writerows(rows)
+        return groups
+
+    def __report_telemetry(self, problemId: str, groups: list[dict], wall: float, llm_wall: float, cpu: float):
+        """Print per-problem LLM totals next to execution time, to tell LLM- from execution-bound runs."""
+        if not groups:
+            return
+        total = lambda key: sum(g[key] for g in groups)
+        table = PrettyTable(["Metric", "Value"])
+        table.title = f"Telemetry ({problemId})"
+        table.align["Metric"] = "r"
+        table.align["Value"] = "l"
+        table.add_row(["#Calls / failed", f"{total('calls')} / {total('failed')}"])
+        table.add_row(["#Samples / cached / empty / discarded", f"{total('samples')} / {total('cached')} / {total('empty')} / {total('discarded')}"])
+        table.add_row(["Tokens in / out", f"{total('prompt_tokens')} / {total('completion_tokens')}"])
+        table.add_row(["Cached prompt tokens", f"{total('cached_tokens')} "
+                       f"({ETC.divide(total('cached_tokens'), total('prompt_tokens')) * 100:.1f}%)"])
+        table.add_row(["Cost ($)", f"{total('cost'):.4f}"])
+        table.add_row(["Queue wait (s)", f"{total('queue_wait'):.2f}"])
+        table.add_row(["Wall-clock (s)", f"{wall:.2f}"])
+        table.add_row(["Waiting on LLM (s)", f"{llm_wall:.2f} ({ETC.divide(llm_wall, wall) * 100:.1f}%)"])
+        table.add_row(["Execution CPU (s)", f"{cpu:.2f}"])
+        print(table)
+
+    def __report_screening(self, problemId: str, screener):
+        """Print per-generation executions / timeout-seconds saved by static screening."""
+        rows = screener.report()
+        if not rows:
+            return
+        table = PrettyTable(["Gen", "Screened", "Flagged", "Exec Saved", "Timeout(s) Saved", "Reasons"])
+        table.title = f"Screening ({problemId})"
+        table.align["Reasons"] = "l"
+        for row in rows:
+            table.add_row(row)
+        print(table)
+
+    def __report_selection(self, problemId: str, n_refs: int, times: list[float]):
+        """Print per-buggy reference-selection time and keep it for the #references summary."""
+        if not times:
+            return
+        self.selection.setdefault(n_refs, []).extend(times)
+        table = PrettyTable(["Metric", "Value"])
+        table.title = f"Reference selection ({problemId})"
+        table.align["Metric"] = "r"
+        table.align["Value"] = "l"
+        table.add_row(["#References", n_refs])
+        table.add_row(["Workers", self.ref_workers or os.cpu_count()])
+        table.add_row(["#Buggy", len(times)])
+        table.add_row(["Mean / buggy (s)", f"{sum(times) / len(times):.3f}"])
+        table.add_row(["p50/p95 (s)", f"{ETC.percentile(times, 50):.3f} / {ETC.percentile(times, 95):.3f}"])
+        print(table)
+
+    def __report_init(self, problemId: str, stats: dict):
+        """Print initial-population LLM round trips and syntax-failure rate."""
+        if not stats["buggys"]:
+            return
+        table = PrettyTable(["Metric", "Value"])
+        table.title = f"Initialization ({problemId})"
+        table.align["Metric"] = "r"
+        table.align["Value"] = "l"
+        table.add_row(["#Buggy", stats["buggys"]])
+        table.add_row(["Rounds / buggy", f"{ETC.divide(stats['rounds'], stats['buggys']):.2f}"])
+        table.add_row(["#Requests", stats["requests"]])
+        table.add_row(["#Received", stats["received"]])
+        table.add_row(["Failure rate", f"{ETC.divide(stats['failures'], stats['requests']) * 100:.2f}%"])
+        table.add_row(["Short after cap", stats["short"]])
+        print(table)
+
     def __core(self, problem: str):
         assignment, timelimit, memlimit, buggys, references, testcases = \
             self.loader.run(problem)
@@ -169,17 +304,88 @@ class Experiments:
         print(f"\n=== {problemId} ===")
 
         Tester.init_globals(testcases, timelimit, memlimit)
+        Baselines.set(problem, problemId)
+        Telemetry.reset()
+        Telemetry.tag(problem=problemId)
+        start, cpu = time.monotonic(), Tester.cpu_seconds
+        llm_wall = sum(map(sum, Models.batches.values()))
 
         if self.approach == "PaREL":
-            parel = PaREffiLearner(buggys, references, assignment)
-            results = parel.run(self.generations, self.pop_size)
+            approach = PaREffiLearner(buggys, references, assignment, self.screening,
+                                      self.ref_workers)
         else:
             rand = True if self.approach == "Random" else False
-            moo_repair = MooRepair(buggys, references, assignment, rand)
-            results = moo_repair.run(self.generations, self.pop_size)
+            approach = MooRepair(buggys, references, assignment, rand, self.screening,
+                                 self.patience, self.tolerance)
+        scheduler = self.scheduler if self.scheduler.active() else None
+        results = approach.run(self.generations, self.pop_size, scheduler)
+        self.scheduler.tally(results)
+        wall, cpu = time.monotonic() - start, Tester.cpu_seconds - cpu
+        llm_wall = sum(map(sum, Models.batches.values())) - llm_wall
 
         self.__save(problemId, buggys, results)
+        self.__save_hypervolume(problemId, buggys, approach.hypervolumes)
+        groups = self.__save_telemetry(problemId)
+        self.__report_telemetry(problemId, groups, wall, llm_wall, cpu)
+        self.__report_screening(problemId, approach.screener)
+        if isinstance(approach, MooRepair):
+            self.__report_init(problemId, approach.init_stats)
+        if isinstance(approach, PaREffiLearner):
+            self.__report_selection(problemId, len(references), approach.selection_times)
 
     def run(self, problems: list) -> None:
         for problem in problems:
+            if self.scheduler.exhausted():
+                print("Budget exhausted, skipping remaining problems")
+                break
             self.__core(problem)
+
+        table = PrettyTable(["Budget", "Value"])
+        table.align["Budget"] = "r"
+        table.align["Value"] = "l"
+        for row in self.scheduler.report():
+            table.add_row(row)
+        print(table)
+
+        if self.selection:
+            table = PrettyTable(["#References", "#Buggy", "Mean / buggy (s)", "p95 (s)"])
+            table.title = f"Reference selection ({self.ref_workers or os.cpu_count()} workers)"
+            for n_refs, times in sorted(self.selection.items()):
+                table.add_row([n_refs, len(times), f"{sum(times) / len(times):.3f}",
+                               f"{ETC.percentile(times, 95):.3f}"])
+            print(table)
+
+        stats = Models.stats()
+        table = PrettyTable(["LLM", "Value"])
+        table.align["LLM"] = "r"
+        table.align["Value"] = "l"
+        table.add_row(["Requests", stats["calls"]])
+        table.add_row(["Samples", stats["samples"]])
+        table.add_row(["Cache hits", stats["cache_hits"]])
+        table.add_row(["Retries", stats["retries"]])
+        table.add_row(["Failed (no patch)", stats["failures"]])
+        for name, count in sorted(stats["errors"].items()):
+            table.add_row([name, count])
+        if stats["streamed"]:
+            table.add_row(["Streamed", stats["streamed"]])
+            table.add_row(["Cut at code end", stats["cut_early"]])
+            table.add_row(["TTFT p50/p95 (s)",
+                f"{ETC.percentile(stats['ttft'], 50):.2f} / {ETC.percentile(stats['ttft'], 95):.2f}"])
+            table.add_row(["Code complete p50/p95 (s)",
+                f"{ETC.percentile(stats['ttcc'], 50):.2f} / {ETC.percentile(stats['ttcc'], 95):.2f}"])
+        table.add_row(["Hedging", f"p{Models.hedge:g}, ratio {Models.hedge_ratio:g}" if Models.hedge else "off"])
+        if Models.hedge:
+            table.add_row(["Hedged / won", f"{stats['hedges']} / {stats['hedge_wins']}"])
+        for desc, times in sorted(stats["batches"].items()):
+            name = "Generation" if desc == "Variation" else desc
+            table.add_row([f"{name} p50/p95 (s)",
+                f"{ETC.percentile(times, 50):.2f} / {ETC.percentile(times, 95):.2f}"])
+        print(table)
+
+        rows = PromptBudget.report()
+        if rows:
+            table = PrettyTable(["Prompt", "#Prompts", "#Compacted", "#Over", "Tokens before", "Tokens after"])
+            table.title = f"Prompt budget ({PromptBudget.budget} tokens)"
+            for row in rows:
+                table.add_row(row)
+            print(table)
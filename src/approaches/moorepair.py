@@ -1,22 +1,44 @@
 import ast
+import math
 from tqdm import tqdm
 
 from ..genetic import Selection, Variation, Fitness
-from ..execution import Program, Programs, Tester
+from ..execution import Program, Programs, Tester, Screener, ResultTable, Baselines
+from ..llms import Models, Telemetry
+from .scheduler import BudgetScheduler, RepairState
 
 
 class MooRepair:
+    # Beta(1, 9) prior on the syntax-failure rate before any LLM output is seen
+    FAIL_PRIOR = (1, 10)
+    # Never request more than this multiple of the missing members in one wave
+    OVERPROVISION_CAP = 2
+
     def __init__(
         self,
         buggys: Programs,
         references: Programs,
         assignment: dict,
         rand: bool = False,
+        screening: str = "deprioritize",
+        patience: int = 0,
+        tolerance: float = 1e-3,
+        init_rounds: int = 3,
     ):
         self.buggys = buggys
         self.references = references
+        self.table = None
         self.variation = Variation(assignment)
         self.selection = Selection(rand)
+        self.screener = Screener(screening)
+        self.patience = patience
+        self.tolerance = tolerance
+        self.hypervolumes = {}
+        self.init_rounds = init_rounds
+        self.init_stats = {
+            "buggys": 0, "rounds": 0, "requests": 0,
+            "received": 0, "failures": 0, "short": 0,
+        }
         self._patch_uid = 0
 
     def _assign_patch_id(self, patch: Program) -> None:
@@ -28,22 +50,51 @@ class MooRepair:
             ast.parse(program.code)
             return True
         except Exception: pass
+        Telemetry.discard(program.code)
         return False
 
+    def _reference_table(self) -> ResultTable | None:
+        """Profiled reference baselines, loaded on first use and shared by every buggy."""
+        if self.selection.rand:
+            return None
+        if self.table is None:
+            self.table = Baselines.table(self.references, "references", profiling=True)
+        return self.table
+
+    def _failure_rate(self) -> float:
+        """Observed fraction of requested candidates that did not yield a valid program."""
+        a, b = self.FAIL_PRIOR
+        return (self.init_stats["failures"] + a) / (self.init_stats["requests"] + b)
+
     def _init_population(self, buggy: Program, pop_size: int) -> list[Program]:
         population = []
+        stats = self.init_stats
+        stats["buggys"] += 1
         tbar = tqdm(total=pop_size, desc="Population", position=1, leave=False)
-        while len(population) < pop_size:
-            references = []
+        for _ in range(self.init_rounds):
             needed = pop_size - len(population)
-            for _ in range(needed):
-                references.append(self.selection.one(buggy, self.references))
+            if needed <= 0: break
+            # Over-provision so one wave usually covers the syntax failures
+            count = min(
+                math.ceil(needed / (1.0 - self._failure_rate())),
+                needed * self.OVERPROVISION_CAP,
+            )
+            references = self.selection.many(buggy, self.references, count, self._reference_table())
             candidates = self.variation.correct(buggy, references)
+            stats["rounds"] += 1
+            stats["requests"] += count
+            stats["received"] += len(candidates)
             for patch in candidates:
-                if self._syntax_check(patch):
-                    self._assign_patch_id(patch)
-                    population.append(patch)
-                    tbar.update(1)
+                if not self._syntax_check(patch) or self.screener.screen(patch, 0):
+                    stats["failures"] += 1
+                    continue
+                if len(population) >= pop_size: continue
+                self._assign_patch_id(patch)
+                population.append(patch)
+                tbar.update(1)
+            stats["failures"] += count - len(candidates)
+        if len(population) < pop_size:
+            stats["short"] += 1
         tbar.close()
         return population
 
@@ -67,50 +118,97 @@ class MooRepair:
                 early_stop = True
         return early_stop
 
-    def _run_single(self, buggy: Program, generations: int, pop_size: int) -> dict:
-        result = {}
-        solutions = []
-        buggy_fitness = Fitness.evaluate(buggy)
+    def _stagnation(self, state: RepairState) -> bool:
+        """Archive hypervolume grew by less than *tolerance* (relative) for *patience* generations."""
+        hv = state.hypervolume
+        if not self.patience or len(hv) <= self.patience:
+            return False
+        for prev, curr in zip(hv[-self.patience - 1:-1], hv[-self.patience:]):
+            if curr > 0 and (curr - prev) / curr >= self.tolerance:
+                return False
+        return True
+
+    def _record(self, state: RepairState, calls: int) -> None:
+        fails = [Fitness.evaluate(p)["f_fail"] for p in state.population]
+        state.trajectory.append(min(fails + [state.fitness["f_fail"]]))
+        state.archive.update(state.population)
+        state.hypervolume.append(state.archive.hypervolume)
+        spent = Models.calls - calls
+        state.llm_log.append(spent + (state.llm_log[-1] if state.llm_log else 0))
+        self.hypervolumes.setdefault(state.buggy.id, []).append(
+            (state.gen, state.hypervolume[-1], state.llm_log[-1], len(state.archive)))
+
+    def _init_state(self, state: RepairState, pop_size: int) -> None:
+        calls = Models.calls
+        Telemetry.tag(buggy=state.buggy.id, gen=0)
+        state.fitness = Fitness.evaluate(state.buggy)
         # Initialization
-        population = self._init_population(buggy, pop_size)
-        for pop in population:
+        state.population = self._init_population(state.buggy, pop_size)
+        for pop in state.population:
             results = Tester.run(pop)
             if not Tester.is_all_pass(results): continue
-            solutions.append(pop)
-
-        for gen in tqdm(range(1, generations + 1), desc="Generation", position=1, leave=False):
-            if self._termination(solutions, buggy_fitness):
-                for remaining in range(gen, generations + 1):
-                    result.setdefault(remaining, solutions.copy())
-                break
-            result.setdefault(gen, solutions.copy())
-
-            # Selection
-            survivors = self.selection.survivor_selection(population, pop_size)
-            self.selection.repair_strategy(survivors)
-            pairs = self.selection.parent_pairs(survivors)
-
-            # Variation
-            offspring = self.variation.run(pairs)
-
-            # Validation
-            for child in offspring:
-                if self._syntax_check(child):
-                    self._assign_patch_id(child)
-                    survivors.append(child)
-                else: continue
-                
-                results = Tester.run(child)
-                if not Tester.is_all_pass(results): continue
-                solutions.append(child)
+            state.solutions.append(pop)
+        self._record(state, calls)
+
+    def _step(self, state: RepairState, pop_size: int) -> None:
+        calls = Models.calls
+        gen = state.gen + 1
+        if self._termination(state.solutions, state.fitness) or self._stagnation(state):
+            state.done = True
+            return
+        state.result.setdefault(gen, state.solutions.copy())
+        Telemetry.tag(buggy=state.buggy.id, gen=gen)
+
+        # Selection
+        survivors = self.selection.survivor_selection(state.population, pop_size)
+        self.selection.repair_strategy(survivors)
+        pairs = self.selection.parent_pairs(survivors)
+
+        # Variation
+        offspring = self.variation.run(pairs)
+
+        # Validation
+        for child in offspring:
+            if self._syntax_check(child) and not self.screener.screen(child, gen):
+                self._assign_patch_id(child)
+                survivors.append(child)
+            else: continue
             
-            # Prepare next generation
-            population = survivors
-
-        return result
+            results = Tester.run(child)
+            if not Tester.is_all_pass(results): continue
+            state.solutions.append(child)
+        
+        # Prepare next generation
+        state.population = survivors
+        state.gen = gen
+        self._record(state, calls)
+
+    def _finalize(self, state: RepairState, generations: int) -> dict:
+        # Terminated or unpromoted: carry the current solutions forward
+        for remaining in range(state.gen + 1, generations + 1):
+            state.result.setdefault(remaining, state.solutions.copy())
+        return state.result
 
-    def run(self, generations: int = 4, pop_size: int = 6) -> dict:
+    def _run_single(self, buggy: Program, generations: int, pop_size: int) -> dict:
+        state = RepairState(buggy=buggy, fitness=None)
+        self._init_state(state, pop_size)
+        for _ in tqdm(range(1, generations + 1), desc="Generation", position=1, leave=False):
+            self._step(state, pop_size)
+            if state.done: break
+        return self._finalize(state, generations)
+
+    def run(self, generations: int = 4, pop_size: int = 6, scheduler: BudgetScheduler | None = None) -> dict:
         results = {}
+        if scheduler is not None:
+            states = scheduler.run(
+                self.buggys,
+                init=lambda state: self._init_state(state, pop_size),
+                step=lambda state: self._step(state, pop_size),
+                generations=generations,
+            )
+            for state in states:
+                results[state.buggy.id] = self._finalize(state, generations)
+            return results
         for buggy in tqdm(self.buggys, desc="Buggy", position=0):
             results[buggy.id] = self._run_single(buggy, generations, pop_size)
         return results
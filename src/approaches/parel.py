@@ -1,29 +1,44 @@
 import ast
-import re
+import os
+import time
 from tqdm import tqdm
-from rank_bm25 import BM25Okapi
-from codebleu import calc_codebleu
-from src.genetic import Fitness, Variation
-from src.execution import Programs, Program, Tester
-from src.utils import ETC
+import numpy as np
+from src.genetic import Fitness, Variation, ParetoArchive
+from src.execution import Programs, Program, Tester, Screener, Baselines
+from src.llms import Models, Telemetry
+from .scheduler import BudgetScheduler
+from .retrieval import BM25Index, CodeBLEUIndex, anonymize
 
 
 class PaREffiLearner:
+    # Per-problem reference features (CodeBLEU, anonymized BM25 corpus) persist here across runs
+    FEATURE_CACHE = ".cache/retrieval"
+
     def __init__(
         self,
         buggys: Programs,
         references: Programs,
         assignement: dict,
+        screening: str = "deprioritize",
+        workers: int | None = None,
     ):
         self.buggys = buggys
         self.references = references
         self.assignement = assignement
         self.variation = Variation(assignement)
+        self.screener = Screener(screening)
+        self.hypervolumes = {}
         self._patch_uid = 0
+        self.workers = workers
+        self.selection_times = []
+        self._prefetch_share = 0.0  # batched CodeBLEU time charged to each buggy's selection
 
-        self.bm25 = BM25Okapi([
-            self._anonymize_code(ref.code).split() 
-            for ref in self.references])
+        problem = assignement.get("id", "").replace("/", "_")
+        cache = lambda kind: os.path.join(self.FEATURE_CACHE, f"{problem}.{kind}.pkl") if problem else None
+        self.bm25 = BM25Index(
+            self.references, lambda code: anonymize(code).split(), cache("bm25"))
+        self.codebleu = CodeBLEUIndex(self.references, cache("codebleu"), workers)
+        self.table = Baselines.table(self.references, "references", workers=workers)
     
     def _assign_patch_id(self, patch: Program) -> None:
         self._patch_uid += 1
@@ -34,107 +49,80 @@ class PaREffiLearner:
             ast.parse(program.code)
             return True
         except Exception: pass
+        Telemetry.discard(program.code)
         return False
     
-    def _match_tc(self, buggy: Program, reference: Program) -> float:
-        buggy_results = Tester.run(buggy)
-        ref_results = Tester.run(reference)
-        buggy_passed, _ = Tester.tests_split(buggy_results)
-        ref_passed, _ = Tester.tests_split(ref_results)
-        clip = len(buggy_passed & ref_passed)
-        denom = len(ref_passed) + len(buggy_passed)
-        return ETC.divide(2 * clip, denom)
+    def _match_tc(self, buggy: Program) -> np.ndarray:
+        """Test-case match of the buggy against every reference, from the reference pass bitsets."""
+        return self.table.match(Tester.run(buggy))
 
-    def _match_codebleu(self, buggy: str, reference: str) -> tuple[float, float]:
-        scores = calc_codebleu(
-            references=[reference],
-            predictions=[buggy],
-            lang="python",
-        )
-        return scores['dataflow_match_score'], scores['syntax_match_score']
+    def _match_codebleu(self, buggy: Program) -> tuple[np.ndarray, np.ndarray]:
+        """CodeBLEU (dataflow, syntax) match of the buggy code against every reference."""
+        return self.codebleu.scores(buggy.code)
 
-    @staticmethod
-    def _anonymize_code(code: str) -> str:
-        try:
-            tree = ast.parse(code)
-        except SyntaxError:
-            return code
-        names = set()
-        for node in ast.walk(tree):
-            if isinstance(node, ast.Name):
-                names.add(node.id)
-            elif isinstance(node, ast.FunctionDef) or isinstance(node, ast.AsyncFunctionDef):
-                names.add(node.name)
-                for arg in node.args.args + node.args.posonlyargs + node.args.kwonlyargs:
-                    names.add(arg.arg)
-            elif isinstance(node, ast.arg):
-                names.add(node.arg)
-        # Sort by length descending to avoid partial replacements
-        mapping = {}
-        for i, name in enumerate(sorted(names, key=len, reverse=True)):
-            mapping[name] = f"v{i}"
-        result = code
-        for orig, anon in mapping.items():
-            result = re.sub(r'\b' + re.escape(orig) + r'\b', anon, result)
-        return result
-
-    def _bm25_anon(self, buggy: Program, reference: Program) -> float:
-        anon_buggy = self._anonymize_code(buggy.code).split()
-        scores = self.bm25.get_scores(anon_buggy)
-        bm25_min, bm25_max = float(scores.min()), float(scores.max())
-        if bm25_max == bm25_min:
-            return 0.0
-        # Find the index of this reference in self.references
-        ref_idx = None
-        for i, ref in enumerate(self.references):
-            if ref.id == reference.id:
-                ref_idx = i
-                break
-        if ref_idx is None:
-            return 0.0
-        return (float(scores[ref_idx]) - bm25_min) / (bm25_max - bm25_min)
+    def _bm25_anon(self, buggy: Program) -> np.ndarray:
+        """Normalized BM25 score of the anonymized buggy code against every reference."""
+        return self.bm25.normalized(anonymize(buggy.code).split())
 
     def _get_reference(self, buggy: Program) -> Program:
-        best_refer = None
-        best_psm = -1.0
-        for refer in self.references:
-            a = self._match_tc(buggy, refer)
-            b, c = self._match_codebleu(buggy.code, refer.code)
-            d = self._bm25_anon(buggy, refer)
-            psm = 0.25 * (a + b + c + d)
-            if psm > best_psm:
-                best_psm = psm
-                best_refer = refer
+        if not len(self.references):
+            return None
+        started = time.perf_counter()
+        # Every component is a vector in reference order
+        test_match = self._match_tc(buggy)
+        dataflow, syntax = self._match_codebleu(buggy)
+        bm25 = self._bm25_anon(buggy)
+        psm = 0.25 * (test_match + dataflow + syntax + bm25)
+        # argmax keeps the first maximum, as the former strict `psm > best_psm` scan did
+        best_refer = self.references[int(np.argmax(psm))]
+        self.selection_times.append(time.perf_counter() - started + self._prefetch_share)
         return best_refer
     
-    def _run_single(self, buggy: Program, generations: int, pop_size: int) -> dict:
+    def _generation(self, buggy: Program, reference: Program, gen: int, pop_size: int, solutions: list[Program]) -> None:
+        patch = self.variation.correct(buggy, [reference])
+        if not patch: return
+        patch = patch[0]
+        passed = False
+        if self._syntax_check(patch) and not self.screener.screen(patch, gen):
+            results = Tester.run(patch, profiling=True)
+            passed = Tester.is_all_pass(results)
+        if not passed: return
+        valids = [patch] * pop_size
+        efficients = self.variation.efficient(valids)
+        for patch in efficients:
+            if self.screener.screen(patch, gen): continue
+            results = Tester.run(patch)
+            passed = Tester.is_all_pass(results)
+            if passed: 
+                self._assign_patch_id(patch)
+                solutions.append(patch)
+
+    def _run_single(self, buggy: Program, generations: int, pop_size: int, scheduler: BudgetScheduler | None = None) -> dict:
         result = {}
         solutions = []
+        archive = ParetoArchive()
         Fitness.evaluate(buggy)
         
+        calls = Models.calls
         reference = self._get_reference(buggy)
         for gen in tqdm(range(1, generations + 1), desc="Generation", position=1, leave=False):
+            if scheduler is not None and scheduler.exhausted(): break
             result.setdefault(gen, solutions.copy())
-            patch = self.variation.correct(buggy, [reference])
-            if not patch: continue
-            patch = patch[0]
-            passed = False
-            if self._syntax_check(patch):
-                results = Tester.run(patch, profiling=True)
-                passed = Tester.is_all_pass(results)
-            if not passed: continue
-            valids = [patch] * pop_size
-            efficients = self.variation.efficient(valids)
-            for patch in efficients:
-                results = Tester.run(patch)
-                passed = Tester.is_all_pass(results)
-                if passed: 
-                    self._assign_patch_id(patch)
-                    solutions.append(patch)
+            Telemetry.tag(buggy=buggy.id, gen=gen)
+            self._generation(buggy, reference, gen, pop_size, solutions)
+            archive.update(solutions)
+            self.hypervolumes.setdefault(buggy.id, []).append(
+                (gen, archive.hypervolume, Models.calls - calls, len(archive)))
         return result
                     
-    def run(self, generations: int = 5, pop_size: int = 6) -> dict:
+    def run(self, generations: int = 5, pop_size: int = 6, scheduler: BudgetScheduler | None = None) -> dict:
         results = {}
+        # Every buggy is scored against the references in one parallel batch up front
+        if len(self.references) and len(self.buggys):
+            started = time.perf_counter()
+            self.codebleu.prefetch([buggy.code for buggy in self.buggys])
+            self._prefetch_share = (time.perf_counter() - started) / len(self.buggys)
         for buggy in tqdm(self.buggys, desc="Buggy", position=0):
-            results[buggy.id] = self._run_single(buggy, generations, pop_size)
+            if scheduler is not None and scheduler.exhausted(): break
+            results[buggy.id] = self._run_single(buggy, generations, pop_size, scheduler)
         return results
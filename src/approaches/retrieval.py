@@ -0,0 +1,327 @@
+import ast
+import hashlib
+import io
+import multiprocessing
+import os
+import pickle
+import tokenize
+from collections import Counter
+from functools import lru_cache
+from typing import Callable
+
+import numpy as np
+from rank_bm25 import BM25Okapi
+from scipy import sparse
+
+from ..execution import Programs
+
+
+def _digest(code: str) -> str:
+    return hashlib.blake2b(code.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _load(path: str | None) -> dict:
+    if path is None or not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "rb") as f:
+            return pickle.load(f)
+    except Exception:
+        return {}
+
+
+def _save(path: str | None, cache: dict):
+    if path is None:
+        return
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        pickle.dump(cache, f)
+    os.replace(tmp, path)
+
+
+# ---------------------------------------------------------------------- #
+# Identifier anonymization                                               #
+# ---------------------------------------------------------------------- #
+
+_SKIP = {tokenize.NL, tokenize.NEWLINE, tokenize.COMMENT, tokenize.INDENT, tokenize.DEDENT}
+
+
+@lru_cache(maxsize=4096)
+def anonymize(code: str) -> str:
+    """*code* with every variable, argument, function, class and import name renamed to v0, v1, ... in order of appearance.
+
+    The names the AST binds or loads are collected first, and every
+    occurrence of them is renamed in one tokenize pass, so a name is
+    anonymized the same way where it is defined and where it is used;
+    attributes, keywords and string contents are left alone. Code that
+    does not parse is returned unchanged.
+    """
+    try:
+        tree = ast.parse(code)
+        lines = list(iter(io.StringIO(code).readline, ""))
+        tokens = list(tokenize.generate_tokens(iter(lines).__next__))
+    except (SyntaxError, tokenize.TokenError, ValueError):
+        return code
+
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name):
+            names.add(node.id)
+        elif isinstance(node, ast.arg):
+            names.add(node.arg)
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            names.add(node.name)
+        elif isinstance(node, ast.alias):
+            # `import a.b` binds a; `import numpy as np` binds np
+            names.add((node.asname or node.name).split(".", 1)[0])
+        elif isinstance(node, ast.ExceptHandler) and node.name:
+            names.add(node.name)
+        elif isinstance(node, (ast.Global, ast.Nonlocal)):
+            names.update(node.names)
+    starts = [0]
+    for line in lines:
+        starts.append(starts[-1] + len(line))
+
+    mapping, out, last, prev = {}, [], 0, None
+    for tok in tokens:
+        if tok.type == tokenize.NAME and tok.string in names and not (prev is not None and prev.string == "."):
+            start = starts[tok.start[0] - 1] + tok.start[1]
+            out.append(code[last:start])
+            out.append(mapping.setdefault(tok.string, f"v{len(mapping)}"))
+            last = start + len(tok.string)
+        if tok.type not in _SKIP:
+            prev = tok
+    out.append(code[last:])
+    return "".join(out)
+
+
+# ---------------------------------------------------------------------- #
+# BM25                                                                   #
+# ---------------------------------------------------------------------- #
+
+class BM25Index:
+    """BM25Okapi over reference token streams, scoring one query against every reference at once.
+
+    The per-(reference, term) BM25 weights are precomputed into a dense
+    matrix, so scoring a query is a single matrix-vector product over its
+    term counts instead of one corpus pass per query token. Scores are
+    identical to BM25Okapi.get_scores. With *cache_path*, the token
+    streams and the built index are persisted and loaded on the next run
+    over the same references.
+    """
+
+    VERSION = 2  # bump when anonymize changes
+
+    def __init__(
+        self,
+        references: Programs,
+        tokenizer: Callable[[str], list[str]],
+        cache_path: str | None = None,
+    ):
+        self.ids = [ref.id for ref in references]
+        self.index = {id: i for i, id in enumerate(self.ids)}
+        keys = [_digest(ref.code) for ref in references]
+        cache = _load(cache_path)
+        if cache.get("version") != self.VERSION:
+            cache = {}
+        if cache.get("keys") == keys:
+            self.vocab, self.weights = cache["vocab"], cache["weights"]
+            return
+
+        streams = cache.get("streams", {})
+        corpus = [
+            streams[key] if key in streams else tokenizer(ref.code)
+            for key, ref in zip(keys, references)
+        ]
+        self._build(corpus)
+        _save(cache_path, {
+            "version": self.VERSION, "keys": keys, "streams": dict(zip(keys, corpus)),
+            "vocab": self.vocab, "weights": self.weights,
+        })
+
+    def _build(self, corpus: list[list[str]]):
+        self.vocab = {}
+        if not corpus:
+            self.weights = np.zeros((0, 0))
+            return
+
+        bm25 = BM25Okapi(corpus)
+        for doc in bm25.doc_freqs:
+            for term in doc:
+                self.vocab.setdefault(term, len(self.vocab))
+        tf = np.zeros((len(corpus), len(self.vocab)))
+        for i, doc in enumerate(bm25.doc_freqs):
+            for term, freq in doc.items():
+                tf[i, self.vocab[term]] = freq
+        idf = np.array([bm25.idf.get(term, 0.0) for term in self.vocab])
+        norm = bm25.k1 * (1 - bm25.b + bm25.b * np.asarray(bm25.doc_len) / bm25.avgdl)
+        self.weights = idf * (tf * (bm25.k1 + 1)) / (tf + norm[:, None])
+
+    def __len__(self):
+        return len(self.ids)
+
+    def scores(self, query: list[str]) -> np.ndarray:
+        """Raw BM25 score of *query* against every reference, in reference order."""
+        counts = np.zeros(len(self.vocab))
+        for term, count in Counter(query).items():
+            col = self.vocab.get(term)
+            if col is not None:
+                counts[col] = count
+        return self.weights @ counts
+
+    def normalized(self, query: list[str]) -> np.ndarray:
+        """Min-max normalized scores; all zeros when every reference scores the same."""
+        scores = self.scores(query)
+        if not len(scores):
+            return scores
+        lo, hi = float(scores.min()), float(scores.max())
+        if hi == lo:
+            return np.zeros_like(scores)
+        return (scores - lo) / (hi - lo)
+
+
+# ---------------------------------------------------------------------- #
+# CodeBLEU syntax / dataflow match                                       #
+# ---------------------------------------------------------------------- #
+
+_PARSER = None
+
+
+def _parser():
+    # One tree-sitter parser per process, created on first use
+    global _PARSER
+    if _PARSER is None:
+        from tree_sitter import Parser
+        from codebleu.utils import get_tree_sitter_language
+        from codebleu.parser import DFG_python
+        parser = Parser()
+        parser.language = get_tree_sitter_language("python")
+        _PARSER = [parser, DFG_python]
+    return _PARSER
+
+
+def codebleu_features(code: str) -> tuple[Counter, Counter]:
+    """Subtree and normalized data-flow multisets of *code*, as calc_codebleu builds them.
+
+    get_data_flow merges parent names through a set, so their order (and
+    the var_i numbering normalize_dataflow derives from it) changes with
+    PYTHONHASHSEED. Parents are sorted before and after normalization,
+    which makes the features stable across processes and safe to cache.
+    """
+    from codebleu.parser import remove_comments_and_docstrings
+    from codebleu.dataflow_match import get_data_flow, normalize_dataflow
+    parser = _parser()
+    code = code.strip()
+    try:
+        code = remove_comments_and_docstrings(code, "python")
+    except Exception:
+        pass
+
+    subtrees = Counter()
+    stack = [parser[0].parse(bytes(code, "utf8")).root_node]
+    while stack:
+        node = stack.pop()
+        subtrees[str(node)] += 1
+        stack.extend(child for child in node.children if child.children)
+
+    flow = [(*item[:3], sorted(item[3]), *item[4:]) for item in get_data_flow(code, parser)]
+    dataflow = Counter(
+        (var, rel, tuple(sorted(parents)))
+        for var, rel, parents in normalize_dataflow(flow)
+    )
+    return subtrees, dataflow
+
+
+def _extract(codes: list[str], workers: int | None = None) -> list[tuple[Counter, Counter]]:
+    # tree-sitter parsing dominates, so many codes are spread over a process pool
+    workers = min(len(codes), workers or multiprocessing.cpu_count())
+    if workers <= 1:
+        return [codebleu_features(code) for code in codes]
+    with multiprocessing.Pool(processes=workers) as pool:
+        return pool.map(codebleu_features, codes, chunksize=max(1, len(codes) // (4 * workers)))
+
+
+def _indicators(counts: Counter) -> list:
+    # min(a, b) over multiset counts is the number of k with a >= k and b >= k
+    return [(item, k) for item, count in counts.items() for k in range(1, count + 1)]
+
+
+class CodeBLEUIndex:
+    """CodeBLEU dataflow and syntax match of candidates against every reference.
+
+    Reference features are extracted once, in parallel, and optionally
+    persisted to *cache_path*, keyed by a digest of the code. They are
+    laid out as sparse reference x feature matrices, so scoring a batch
+    of candidates is two sparse products: syntax weights each reference
+    subtree the candidates contain, and dataflow counts shared
+    (item, k-th occurrence) indicators, which sums min(count) per item.
+    Scores equal calc_codebleu's dataflow_match_score and
+    syntax_match_score for a single (reference, prediction) pair, up to
+    calc_codebleu's own hash-seed dependent parent order.
+    """
+
+    VERSION = 2  # bump when codebleu_features changes
+
+    def __init__(self, references: Programs, cache_path: str | None = None, workers: int | None = None):
+        self.ids = [ref.id for ref in references]
+        self.index = {id: i for i, id in enumerate(self.ids)}
+        self.workers = workers
+        self._scores = {}
+        cache = _load(cache_path)
+        features = cache.get("features", {}) if cache.get("version") == self.VERSION else {}
+        keys = [_digest(ref.code) for ref in references]
+        missing = list(dict.fromkeys(
+            (key, ref.code) for key, ref in zip(keys, references) if key not in features))
+        for (key, _), extracted in zip(missing, _extract([code for _, code in missing], workers)):
+            features[key] = extracted
+        if missing:
+            _save(cache_path, {"version": self.VERSION, "features": features})
+        self.features = [features[key] for key in keys]
+
+        self.vocab_syntax, self.vocab_dataflow = {}, {}
+        self.syntax = self._matrix([subtrees for subtrees, _ in self.features], self.vocab_syntax, True)
+        self.dataflow = self._matrix(
+            [Counter(_indicators(dataflow)) for _, dataflow in self.features], self.vocab_dataflow, True)
+        self.totals = (
+            np.asarray(self.syntax.sum(axis=1)).ravel(),
+            np.asarray(self.dataflow.sum(axis=1)).ravel(),
+        )
+
+    @staticmethod
+    def _matrix(rows: list[Counter], vocab: dict, grow: bool) -> sparse.csr_matrix:
+        # One row per multiset; items outside a fixed vocab cannot match any reference and are dropped
+        data, cols, indptr = [], [], [0]
+        for counts in rows:
+            for item, count in counts.items():
+                col = vocab.setdefault(item, len(vocab)) if grow else vocab.get(item)
+                if col is not None:
+                    cols.append(col)
+                    data.append(count)
+            indptr.append(len(cols))
+        return sparse.csr_matrix((data, cols, indptr), shape=(len(rows), len(vocab)), dtype=float)
+
+    def prefetch(self, codes: list[str], workers: int | None = None):
+        """Score many candidates at once (features extracted in parallel) and memoize the results."""
+        codes = [code for code in dict.fromkeys(codes) if code not in self._scores]
+        if not codes:
+            return
+        features = _extract(codes, workers if workers is not None else self.workers)
+        present = self._matrix(
+            [Counter(dict.fromkeys(subtrees, 1)) for subtrees, _ in features], self.vocab_syntax, False)
+        shared = self._matrix(
+            [Counter(_indicators(dataflow)) for _, dataflow in features], self.vocab_dataflow, False)
+        # (candidates x references) matched subtree weight and shared dataflow occurrences
+        syntax = (present @ self.syntax.T).toarray()
+        dataflow = (shared @ self.dataflow.T).toarray()
+        n_syntax, n_dataflow = self.totals
+        syntax = np.divide(syntax, n_syntax, out=np.zeros_like(syntax), where=n_syntax != 0)
+        dataflow = np.divide(dataflow, n_dataflow, out=np.zeros_like(dataflow), where=n_dataflow != 0)
+        for code, df, syn in zip(codes, dataflow, syntax):
+            self._scores[code] = (df, syn)
+
+    def scores(self, code: str) -> tuple[np.ndarray, np.ndarray]:
+        """(dataflow match, syntax match) of *code* against every reference, in reference order."""
+        if code not in self._scores:
+            self.prefetch([code], workers=1)
+        return self._scores[code]
@@ -0,0 +1,162 @@
+import math
+from dataclasses import dataclass, field
+from typing import Callable
+
+from tqdm import tqdm
+
+from ..execution import Program, Tester
+from ..genetic import ParetoArchive
+from ..llms import Models
+
+
+@dataclass
+class RepairState:
+    buggy:Program = field(metadata={"desc":"Buggy program under repair"})
+    fitness:dict = field(metadata={"desc":"Buggy fitness {f_fail, f_time, f_mem}"})
+    population:list = field(default_factory=list, metadata={"desc":"Current population"})
+    solutions:list = field(default_factory=list, metadata={"desc":"Programs passing all tests so far"})
+    result:dict = field(default_factory=dict, metadata={"desc":"gen -> solutions snapshot"})
+    gen:int = field(default=0, metadata={"desc":"Generations completed"})
+    done:bool = field(default=False, metadata={"desc":"Terminated, no further generations"})
+    trajectory:list = field(default_factory=list, metadata={"desc":"Best f_fail after init and each generation"})
+    archive:ParetoArchive = field(default_factory=ParetoArchive, metadata={"desc":"Elitist Pareto archive across generations"})
+    hypervolume:list = field(default_factory=list, metadata={"desc":"Archive hypervolume after init and each generation"})
+    llm_log:list = field(default_factory=list, metadata={"desc":"Cumulative LLM calls after init and each generation"})
+    llm_calls:int = field(default=0, metadata={"desc":"LLM calls spent on this buggy"})
+    cpu_seconds:float = field(default=0.0, metadata={"desc":"Execution CPU-seconds spent on this buggy"})
+
+
+class BudgetScheduler:
+    """Allocate generations across buggy programs under a global budget.
+
+    Every buggy is initialised and run for *min_gens* generations (rung 0).
+    After each rung the unfinished buggies are ranked by progress and only
+    the top 1/eta are promoted to the next rung, which runs eta times as many
+    generations (successive halving). eta=1 promotes everyone, i.e. the
+    original fixed-generation schedule run breadth-first.
+
+    The LLM-call and CPU-second budgets are hard limits for the whole run:
+    once either is spent no further initialisation or generation starts.
+    """
+
+    def __init__(
+        self,
+        llm_budget: int | None = None,
+        cpu_budget: float | None = None,
+        eta: int = 1,
+        min_gens: int = 1,
+    ):
+        assert eta >= 1, "eta must be >= 1"
+        assert min_gens >= 1, "min_gens must be >= 1"
+        self.llm_budget = llm_budget
+        self.cpu_budget = cpu_budget
+        self.eta = eta
+        self.min_gens = min_gens
+        self._llm_start = Models.calls
+        self._cpu_start = Tester.cpu_seconds
+        self.buggys = 0
+        self.fixed = 0
+
+    # ------------------------------------------------------------------ #
+    # Budget                                                             #
+    # ------------------------------------------------------------------ #
+
+    def active(self) -> bool:
+        """False when neither a budget nor halving is configured."""
+        return self.llm_budget is not None or self.cpu_budget is not None or self.eta > 1
+
+    def llm_spent(self) -> int:
+        return Models.calls - self._llm_start
+
+    def cpu_spent(self) -> float:
+        return Tester.cpu_seconds - self._cpu_start
+
+    def exhausted(self) -> bool:
+        if self.llm_budget is not None and self.llm_spent() >= self.llm_budget:
+            return True
+        if self.cpu_budget is not None and self.cpu_spent() >= self.cpu_budget:
+            return True
+        return False
+
+    def charge(self, state: RepairState, step: Callable[[], None]):
+        """Run *step* and attribute its LLM calls / CPU-seconds to *state*."""
+        calls, cpu = Models.calls, Tester.cpu_seconds
+        step()
+        state.llm_calls += Models.calls - calls
+        state.cpu_seconds += Tester.cpu_seconds - cpu
+
+    # ------------------------------------------------------------------ #
+    # Promotion                                                          #
+    # ------------------------------------------------------------------ #
+
+    @staticmethod
+    def progress(state: RepairState) -> float:
+        """Overall plus most recent drop in best f_fail, plus relative HV gain."""
+        traj = state.trajectory
+        if len(traj) < 2:
+            return 0.0
+        score = (traj[0] - traj[-1]) + (traj[-2] - traj[-1])
+        hv = state.hypervolume
+        if len(hv) >= 2 and hv[-1] > 0:
+            score += (hv[-1] - hv[-2]) / hv[-1]
+        return score
+
+    def promote(self, states: list[RepairState]) -> list[RepairState]:
+        """Keep the top ceil(n/eta) states; ties keep the original order."""
+        if self.eta == 1:
+            return states
+        keep = max(1, math.ceil(len(states) / self.eta))
+        ranked = sorted(range(len(states)), key=lambda i: -self.progress(states[i]))
+        selected = set(ranked[:keep])
+        return [s for i, s in enumerate(states) if i in selected]
+
+    # ------------------------------------------------------------------ #
+    # Driver                                                             #
+    # ------------------------------------------------------------------ #
+
+    def run(
+        self,
+        buggys: list[Program],
+        init: Callable[[RepairState], None],
+        step: Callable[[RepairState], None],
+        generations: int,
+    ) -> list[RepairState]:
+        states = []
+        for buggy in tqdm(buggys, desc="Buggy", position=0):
+            if self.exhausted():
+                break
+            state = RepairState(buggy=buggy, fitness=None)
+            self.charge(state, lambda: init(state))
+            states.append(state)
+
+        active = [s for s in states if not s.done]
+        target = self.min_gens
+        rung = 0
+        while active and not self.exhausted():
+            target = min(target, generations)
+            for state in tqdm(active, desc=f"Rung {rung}", position=0, leave=False):
+                while state.gen < target and not state.done:
+                    if self.exhausted():
+                        break
+                    self.charge(state, lambda: step(state))
+            active = [s for s in active if not s.done and s.gen < generations]
+            active = self.promote(active)
+            target = generations if self.eta == 1 else target * self.eta
+            rung += 1
+
+        return states
+
+    def tally(self, results: dict):
+        """Count buggies with at least one solution in *results* (buggy_id -> gen -> patches)."""
+        self.buggys += len(results)
+        self.fixed += sum(1 for gen_result in results.values() if any(gen_result.values()))
+
+    def report(self) -> list[list]:
+        calls = self.llm_spent()
+        return [
+            ["Buggy", f"{self.buggys:,}"],
+            ["Fixed", f"{self.fixed:,}"],
+            ["LLM calls", f"{calls:,}"],
+            ["CPU(s)", f"{self.cpu_spent():.1f}"],
+            ["Fixes / 1k LLM calls", f"{self.fixed / calls * 1000:.2f}" if calls else "N/A"],
+        ]
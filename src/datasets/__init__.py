@@ -1,3 +1,5 @@
+from .bench import DatasetBenchmark
 from .build import DatasetBuilder
+from .convert import DatasetConverter
 from .summary import DatasetSummary
 from .verify import DatasetVerifier
@@ -0,0 +1,99 @@
+import os
+import random
+import tempfile
+import time
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from prettytable import PrettyTable
+
+from .build import DatasetBuilder
+
+
+class DatasetBenchmark:
+    """Build throughput on a synthetic local parquet fixture.
+
+    Generates Codeforces-shaped problem and submission files in a
+    temporary directory, runs DatasetBuilder on them with its data and
+    datasets cache redirected there, and reports rows/sec per phase.
+    """
+
+    VERDICTS = ["OK", "WRONG_ANSWER", "TIME_LIMIT_EXCEEDED", "MEMORY_LIMIT_EXCEEDED", "RUNTIME_ERROR"]
+    LANGUAGES = ["Python 3", "PyPy 3", "GNU C++17", "Java 11", "Kotlin 1.7"]
+    TESTSETS = ["TESTS", "TESTS", "PRETESTS"]
+
+    @staticmethod
+    def _problem_id(i: int) -> str:
+        return f"{1000 + i}/A"
+
+    @classmethod
+    def write_fixture(cls, directory: str, rows: int, problems: int, code_len: int, seed: int = 0) -> tuple[str, str]:
+        """(problems path, submissions path) of a fixture with *rows* submissions over *problems* problems."""
+        rng = random.Random(seed)
+        problems_path = os.path.join(directory, "problems.parquet")
+        pq.write_table(pa.table({
+            "id": [cls._problem_id(i) for i in range(problems)],
+            "title": [f"Problem {i}" for i in range(problems)],
+            "description": ["..."] * problems,
+            "input_format": ["..."] * problems,
+            "output_format": ["..."] * problems,
+            "time_limit": [1.0] * problems,
+            "memory_limit": [256.0] * problems,
+            "official_tests": [
+                [{"input": f"{j}\n", "output": f"{j}\n"} for j in range(3)]
+                for _ in range(problems)
+            ],
+        }), problems_path)
+
+        # A few problem IDs without a problem row, as in the real submissions
+        submissions_path = os.path.join(directory, "submissions.parquet")
+        body = "x = int(input())\n" * (code_len // 17)
+        pq.write_table(pa.table({
+            "problem_id": [cls._problem_id(rng.randrange(problems + problems // 10 + 1)) for _ in range(rows)],
+            "submission_id": list(range(rows)),
+            "source": [f"{body}print(x + {i})\n" for i in range(rows)],
+            "programmingLanguage": [rng.choice(cls.LANGUAGES) for _ in range(rows)],
+            "verdict": [rng.choice(cls.VERDICTS) for _ in range(rows)],
+            "testset": [rng.choice(cls.TESTSETS) for _ in range(rows)],
+        }), submissions_path)
+        return problems_path, submissions_path
+
+    @classmethod
+    def run(
+        cls,
+        rows: int = 200_000,
+        problems: int = 40,
+        code_len: int = 500,
+        language: str | None = None,
+        min_count: int = 5,
+        max_memory: int = 512,
+    ) -> dict[str, float]:
+        data_dir, cache_dir = DatasetBuilder.DATA_DIR, DatasetBuilder.CACHE_DIR
+        with tempfile.TemporaryDirectory() as directory:
+            print(f"Generating {rows:,} submissions over {problems:,} problems...")
+            problems_path, submissions_path = cls.write_fixture(directory, rows, problems, code_len)
+            DatasetBuilder.DATA_DIR = os.path.join(directory, "data")
+            DatasetBuilder.CACHE_DIR = os.path.join(directory, "hf")
+            started = time.perf_counter()
+            try:
+                DatasetBuilder.run(
+                    language=language,
+                    min_count=min_count,
+                    max_memory=max_memory,
+                    problems_path=problems_path,
+                    submissions_path=submissions_path,
+                )
+            finally:
+                DatasetBuilder.DATA_DIR, DatasetBuilder.CACHE_DIR = data_dir, cache_dir
+            total = time.perf_counter() - started
+
+        table = PrettyTable(["Phase", "Rows", "Seconds", "Rows/sec"])
+        table.align["Phase"] = "l"
+        for column in ("Rows", "Seconds", "Rows/sec"):
+            table.align[column] = "r"
+        throughput = {}
+        for phase, (n, seconds) in [*DatasetBuilder.timings.items(), ("total", (rows, total))]:
+            throughput[phase] = n / seconds if seconds else 0.0
+            table.add_row([phase.capitalize(), f"{n:,}", f"{seconds:.2f}", f"{throughput[phase]:,.0f}"])
+        print(table)
+        return throughput
@@ -1,18 +1,117 @@
-import json
 import os
-from collections import defaultdict
+import pickle
+import shutil
+import time
+from collections import Counter, defaultdict
+from collections.abc import Iterable, Iterator, Mapping
 
+import pyarrow as pa
+import pyarrow.compute as pc
 from datasets import load_dataset
 from dotenv import load_dotenv
 from prettytable import PrettyTable
 from tqdm import tqdm
 
+from src.utils import DatasetStore
+
 load_dotenv()
 
 
+class ProblemIndex(Mapping):
+    """Problem rows by ID, read from the Arrow-backed splits on access instead of held as dicts."""
+
+    def __init__(self, dataset, splits: list[str], batch_size: int = 10_000):
+        self.splits = {split: dataset[split] for split in splits}
+        self.rows = {}
+        for split, ds in self.splits.items():
+            offset = 0
+            for batch in ds.select_columns(["id"]).iter(batch_size=batch_size):
+                for i, id in enumerate(batch["id"], start=offset):
+                    self.rows[id] = (split, i)
+                offset += len(batch["id"])
+
+    def __getitem__(self, id: str) -> dict:
+        split, i = self.rows[id]
+        return self.splits[split][i]
+
+    def __contains__(self, id) -> bool:
+        return id in self.rows
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def __len__(self):
+        return len(self.rows)
+
+
+class SubmissionSpill:
+    """Per-problem submission groups with a bounded in-memory buffer.
+
+    Rows are pickled once on add() and buffered per problem; once the
+    buffer exceeds *max_bytes*, the largest groups are appended to one
+    file per problem under *directory*. pop() yields a problem's rows,
+    spilled ones first, and forgets them.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.buffers = defaultdict(list)
+        self.sizes = defaultdict(int)
+        self.buffered = 0
+        self.peak = 0
+        self.spilled = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, problem_id: str) -> str:
+        return os.path.join(self.directory, problem_id.replace("/", "_") + ".pkl")
+
+    def add(self, problem_id: str, row: dict):
+        record = pickle.dumps(row, protocol=pickle.HIGHEST_PROTOCOL)
+        size = len(record) + 64
+        self.buffers[problem_id].append(record)
+        self.sizes[problem_id] += size
+        self.buffered += size
+        self.peak = max(self.peak, self.buffered)
+        if self.buffered > self.max_bytes:
+            self.flush(self.max_bytes // 2)
+
+    def flush(self, target: int = 0):
+        """Spill the largest groups until at most *target* bytes stay buffered."""
+        for problem_id in sorted(self.sizes, key=self.sizes.get, reverse=True):
+            if self.buffered <= target:
+                break
+            with open(self._path(problem_id), "ab") as f:
+                for record in self.buffers.pop(problem_id):
+                    f.write(record)
+            self.buffered -= self.sizes.pop(problem_id)
+            self.spilled += 1
+
+    def pop(self, problem_id: str) -> Iterator[dict]:
+        path = self._path(problem_id)
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                while f.peek(1):
+                    yield pickle.load(f)
+            os.remove(path)
+        self.buffered -= self.sizes.pop(problem_id, 0)
+        yield from map(pickle.loads, self.buffers.pop(problem_id, []))
+
+    def discard(self, problem_id: str):
+        for _ in self.pop(problem_id):
+            pass
+
+    def close(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
 class DatasetBuilder:
     KEEP_VERDICT = {"OK", "WRONG_ANSWER", "TIME_LIMIT_EXCEEDED", "MEMORY_LIMIT_EXCEEDED"}
     GENERATED_TESTS_REPO = "open-r1/codeforces"
+    DATA_DIR = "data"
+    CACHE_DIR = None  # datasets cache; None = the HuggingFace default
+    BATCH_SIZE = 10_000
+    timings = {}
     _generated_tests_cache: dict[str, dict[str, list[dict]]] = {}
 
     LANGUAGES = {
@@ -38,38 +137,83 @@ class DatasetBuilder:
     }
 
     @classmethod
-    def load_problems(cls) -> dict:
+    def load_problems(cls, path: str | None = None) -> ProblemIndex:
+        """Codeforces problems, or the local parquet file(s) at *path*."""
         print("Loading codeforces problems...")
-        problems_ds = load_dataset("open-r1/codeforces", name="verifiable")
-        problems = {}
-        for split in ["train", "test"]:
-            for row in problems_ds[split]:
-                problems[row["id"]] = row
-        return problems
+        if path is not None:
+            problems_ds = load_dataset("parquet", data_files=path, cache_dir=cls.CACHE_DIR)
+            return ProblemIndex(problems_ds, list(problems_ds), cls.BATCH_SIZE)
+        problems_ds = load_dataset("open-r1/codeforces", name="verifiable", cache_dir=cls.CACHE_DIR)
+        return ProblemIndex(problems_ds, ["train", "test"], cls.BATCH_SIZE)
 
     @classmethod
-    def load_submissions(cls, valid_ids: set, language: str | None) -> dict:
+    def load_submissions(cls, valid_ids: set, language: str | None, path: str | None = None):
+        """Filtered submissions, still on disk as an Arrow-backed dataset.
+
+        The filter is evaluated per batch with Arrow compute kernels.
+        """
         print("Loading codeforces submissions...")
-        subs_ds = load_dataset("open-r1/codeforces-submissions", split="train")
-        subs_ds = subs_ds.filter(
-            lambda row: (
-                row["problem_id"] in valid_ids
-                and (language is None or row["programmingLanguage"] == language)
-                and row["verdict"] in cls.KEEP_VERDICT
-                and row["testset"] == "TESTS"
-            ),
-            num_proc=os.cpu_count(),
+        if path is not None:
+            subs_ds = load_dataset("parquet", data_files=path, split="train", cache_dir=cls.CACHE_DIR)
+        else:
+            subs_ds = load_dataset("open-r1/codeforces-submissions", split="train", cache_dir=cls.CACHE_DIR)
+        valid = pa.array(sorted(valid_ids), type=pa.string())
+        keep = pa.array(sorted(cls.KEEP_VERDICT), type=pa.string())
+
+        def mask(problem_id, lang, verdict, testset):
+            keep_rows = pc.and_(
+                pc.and_(pc.is_in(problem_id, value_set=valid), pc.is_in(verdict, value_set=keep)),
+                pc.equal(testset, "TESTS"),
+            )
+            if language is not None:
+                keep_rows = pc.and_(keep_rows, pc.equal(lang, language))
+            return pc.fill_null(keep_rows, False)
+
+        started = time.perf_counter()
+        rows = len(subs_ds)
+        subs_ds = subs_ds.with_format("arrow").filter(
+            mask,
+            batched=True,
+            batch_size=cls.BATCH_SIZE,
+            input_columns=["problem_id", "programmingLanguage", "verdict", "testset"],
+            num_proc=min(os.cpu_count(), max(1, rows // cls.BATCH_SIZE)),
         )
-        groups = defaultdict(list)
-        for row in tqdm(subs_ds, desc="Grouping", unit="row"):
-            lang = row["programmingLanguage"]
-            groups[row["problem_id"]].append({
-                "id": str(row["submission_id"]),
-                "code": str(row["source"]),
-                "ext": cls.LANGUAGES.get(lang, lang),
-                "status": str(row["verdict"]),
-            })
-        return groups
+        cls.timings["filter"] = (rows, time.perf_counter() - started)
+        return subs_ds
+
+    @classmethod
+    def count_submissions(cls, subs_ds) -> pa.Table:
+        """(problem_id, verdict, count) aggregated batch by batch from those two columns."""
+        columns = subs_ds.with_format("arrow").select_columns(["problem_id", "verdict"])
+        # Batches gathered through a filter's indices come one chunk per row; combine them first
+        partials = [
+            batch.combine_chunks().group_by(["problem_id", "verdict"], use_threads=False)
+            .aggregate([([], "count_all")])
+            for batch in columns.iter(batch_size=cls.BATCH_SIZE)
+        ]
+        if not partials:
+            return pa.table({"problem_id": pa.array([], pa.string()), "verdict": pa.array([], pa.string()),
+                             "count": pa.array([], pa.int64())})
+        counts = pa.concat_tables(partials).group_by(["problem_id", "verdict"]).aggregate([("count_all", "sum")])
+        return counts.rename_columns(["problem_id", "verdict", "count"])
+
+    @classmethod
+    def eligible_problems(cls, counts: pa.Table, min_count: int) -> set[str]:
+        """Problems with at least *min_count* submissions of every kept verdict, from the aggregates."""
+        enough = counts.filter(pc.and_(
+            pc.is_in(counts["verdict"], value_set=pa.array(sorted(cls.KEEP_VERDICT))),
+            pc.greater_equal(counts["count"], min_count),
+        ))
+        verdicts = enough.group_by("problem_id").aggregate([("verdict", "count_distinct")])
+        complete = pc.equal(verdicts["verdict_count_distinct"], len(cls.KEEP_VERDICT))
+        return set(verdicts.filter(complete)["problem_id"].to_pylist())
+
+    @classmethod
+    def _map_ext(cls, lang: pa.ChunkedArray) -> pa.ChunkedArray:
+        # LANGUAGES lookup for a whole column; unknown languages keep their name
+        names = pa.array(list(cls.LANGUAGES), type=pa.string())
+        exts = pa.array(list(cls.LANGUAGES.values()), type=pa.string())
+        return pc.coalesce(pc.take(exts, pc.index_in(lang, value_set=names)), lang)
 
     @staticmethod
     def build_assignment(problem: dict):
@@ -128,77 +272,150 @@ class DatasetBuilder:
             for index, testcase in enumerate(merged, start=1)
         ]
 
+    @classmethod
+    def passes_min_counts(cls, counts: Mapping[str, int], min_count: int) -> bool:
+        return all(counts.get(verdict, 0) >= min_count for verdict in cls.KEEP_VERDICT)
+
     @classmethod
     def passes_min_filter(cls, submissions: list[dict], min_count: int) -> bool:
-        counts = defaultdict(int)
-        for submission in submissions:
-            counts[submission["status"]] += 1
-        return all(counts[verdict] >= min_count for verdict in cls.KEEP_VERDICT)
+        return cls.passes_min_counts(Counter(s["status"] for s in submissions), min_count)
+
+    @classmethod
+    def _out_path(cls, problem_id: str) -> str:
+        return os.path.join(cls.DATA_DIR, problem_id.replace("/", "_"), DatasetStore.FILENAME)
 
     @classmethod
     def write_problem(
         cls,
         problem_id: str,
         problem: dict,
-        submissions: list[dict],
+        submissions: Iterable[dict],
         min_count: int,
+        counts: Mapping[str, int] | None = None,
     ) -> bool:
-        safe_id = problem_id.replace("/", "_")
-        out_path = os.path.join("data", safe_id, "dataset.json")
+        """Write one problem's DatasetStore, streaming *submissions* one at a time.
+
+        *counts* are the problem's verdict counts; without them the
+        submissions are materialized to apply the min-count filter.
+        """
+        out_path = cls._out_path(problem_id)
+        if counts is None:
+            submissions = list(submissions)
+            counts = Counter(s["status"] for s in submissions)
 
-        if not cls.passes_min_filter(submissions, min_count):
-            if os.path.exists(out_path):
-                os.remove(out_path)
+        if not cls.passes_min_counts(counts, min_count):
+            DatasetStore.remove(os.path.dirname(out_path))
             return False
 
         test_cases = cls.extract_test_cases(problem)
         if not test_cases:
             return False
 
-        dataset = {
-            "assignment": cls.build_assignment(problem),
-            "submissions": submissions,
-            "test_cases": test_cases,
-        }
-
-        os.makedirs(os.path.dirname(out_path), exist_ok=True)
-        with open(out_path, "w", encoding="utf-8") as f:
-            json.dump(dataset, f, ensure_ascii=False, indent=2)
+        DatasetStore.write(out_path, cls.build_assignment(problem), submissions, test_cases)
         return True
 
     @classmethod
     def write_dataset(
         cls,
-        groups: dict,
-        problems: dict,
+        subs_ds,
+        problems: Mapping[str, dict],
         min_count: int,
+        max_memory: int = 512,
     ) -> int:
+        """Stream *subs_ds* in Arrow batches and write each problem once its last submission is seen.
+
+        At most *max_memory* MB of submissions are buffered; larger groups
+        spill to disk under DATA_DIR/.spill until their problem is complete.
+        Counting, eligibility, the language mapping and the per-batch
+        group-by are Arrow operations; per row remain only building the
+        submission dicts, pickling spilled ones and compressing the code
+        into each problem's DatasetStore.
+        """
         written = 0
         verdict_counts = defaultdict(int)
         lang_counts = defaultdict(int)
         total_subs = 0
 
-        for problem_id, submissions in tqdm(groups.items(), desc="Writing", unit="problem"):
-            problem = problems.get(problem_id)
-            if problem is None:
-                continue
-            if cls.write_problem(
-                problem_id,
-                problem,
-                submissions,
-                min_count,
-            ):
-                written += 1
-                total_subs += len(submissions)
-                for submission in submissions:
-                    verdict_counts[submission["status"]] += 1
-                    lang_counts[submission["ext"]] += 1
+        started = time.perf_counter()
+        counts = cls.count_submissions(subs_ds)
+        eligible = cls.eligible_problems(counts, min_count) & set(problems)
+        per_problem = defaultdict(Counter)
+        for row in counts.to_pylist():
+            per_problem[row["problem_id"]][row["verdict"]] = row["count"]
+        for problem_id in per_problem.keys() - eligible:
+            DatasetStore.remove(os.path.dirname(cls._out_path(problem_id)))
+        cls.timings["count"] = (len(subs_ds), time.perf_counter() - started)
+
+        started = time.perf_counter()
+        remaining = {problem_id: sum(per_problem[problem_id].values()) for problem_id in eligible}
+        exts = defaultdict(Counter)
+        spill = SubmissionSpill(os.path.join(cls.DATA_DIR, ".spill"), max_memory << 20)
+        pbar = tqdm(total=len(eligible), desc="Writing", unit="problem")
+        try:
+            columns = ["problem_id", "submission_id", "source", "programmingLanguage", "verdict"]
+            eligible_ids = pa.array(sorted(eligible), type=pa.string())
+            batches = subs_ds.with_format("arrow").select_columns(columns).iter(batch_size=cls.BATCH_SIZE)
+            for batch in batches:
+                batch = batch.combine_chunks()
+                keep = pc.is_in(batch["problem_id"], value_set=eligible_ids)
+                rows = pc.filter(pa.array(range(batch.num_rows), type=pa.int64()), keep)
+                if not len(rows):
+                    continue
+                ext = cls._map_ext(batch["programmingLanguage"])
+                kept = pa.table({
+                    "problem_id": pc.take(batch["problem_id"], rows),
+                    "ext": pc.take(ext, rows),
+                    "row": rows,
+                })
+                # Single-threaded grouping keeps problems and rows in batch order
+                groups = kept.group_by("problem_id", use_threads=False).aggregate([("row", "list")])
+                for row in kept.group_by(["problem_id", "ext"], use_threads=False).aggregate([([], "count_all")]).to_pylist():
+                    exts[row["problem_id"]][row["ext"]] += row["count_all"]
+                ids = pc.cast(batch["submission_id"], pa.string()).to_pylist()
+                codes = pc.cast(batch["source"], pa.string()).to_pylist()
+                status = pc.cast(batch["verdict"], pa.string()).to_pylist()
+                ext = ext.to_pylist()
+
+                for problem_id, rows in zip(groups["problem_id"].to_pylist(), groups["row_list"].to_pylist()):
+                    for i in rows:
+                        spill.add(problem_id, {"id": ids[i], "code": codes[i], "ext": ext[i], "status": status[i]})
+                    remaining[problem_id] -= len(rows)
+                    if remaining[problem_id]:
+                        continue
+
+                    # Last submission of this problem: write it and free its buffer
+                    del remaining[problem_id]
+                    if cls.write_problem(
+                        problem_id,
+                        problems[problem_id],
+                        spill.pop(problem_id),
+                        min_count,
+                        per_problem[problem_id],
+                    ):
+                        written += 1
+                        total_subs += sum(per_problem[problem_id].values())
+                        for verdict, n in per_problem[problem_id].items():
+                            verdict_counts[verdict] += n
+                        for name, n in exts[problem_id].items():
+                            lang_counts[name] += n
+                    else:
+                        spill.discard(problem_id)
+                    del exts[problem_id]
+                    pbar.update(1)
+        finally:
+            pbar.close()
+            spill.close()
+        cls.timings["write"] = (len(subs_ds), time.perf_counter() - started)
 
         overview = PrettyTable(["Metric", "Count"])
         overview.align["Metric"] = "l"
         overview.align["Count"] = "r"
         overview.add_row(["Problems", f"{written:,}"])
         overview.add_row(["Submissions", f"{total_subs:,}"])
+        overview.add_row(["Peak buffered (MB)", f"{spill.peak / (1 << 20):,.1f}"])
+        overview.add_row(["Spills", f"{spill.spilled:,}"])
+        for phase, (rows, seconds) in cls.timings.items():
+            overview.add_row([f"{phase.capitalize()} rows/sec", f"{rows / seconds if seconds else 0:,.0f}"])
         print(overview)
 
         verdict_table = PrettyTable(["Verdict", "Count", "%"])
@@ -226,7 +443,11 @@ class DatasetBuilder:
         cls,
         language: str | None = None,
         min_count: int = 20,
+        max_memory: int = 512,
+        problems_path: str | None = None,
+        submissions_path: str | None = None,
     ) -> int:
-        problems = cls.load_problems()
-        groups = cls.load_submissions(set(problems.keys()), language)
-        return cls.write_dataset(groups, problems, min_count)
+        cls.timings = {}
+        problems = cls.load_problems(problems_path)
+        subs_ds = cls.load_submissions(set(problems.keys()), language, submissions_path)
+        return cls.write_dataset(subs_ds, problems, min_count, max_memory)
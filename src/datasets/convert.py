@@ -0,0 +1,42 @@
+import glob
+import os
+
+from prettytable import PrettyTable
+from tqdm import tqdm
+
+from src.utils import DatasetStore
+
+
+class DatasetConverter:
+    DATA_DIR = "data"
+
+    @staticmethod
+    def _size(directory: str) -> int:
+        blobs = glob.glob(os.path.join(directory, DatasetStore.BLOBS, "*"))
+        return os.path.getsize(os.path.join(directory, DatasetStore.FILENAME)) + sum(map(os.path.getsize, blobs))
+
+    @classmethod
+    def run(cls, remove: bool = False) -> int:
+        """Import every data/*/dataset.json into a DatasetStore; returns the number converted."""
+        paths = sorted(glob.glob(os.path.join(cls.DATA_DIR, "*", DatasetStore.LEGACY)))
+        if not paths:
+            print(f"No {DatasetStore.LEGACY} files found under {cls.DATA_DIR}")
+            return 0
+
+        before = after = 0
+        for path in tqdm(paths, desc="Converting", unit="problem"):
+            before += os.path.getsize(path)
+            DatasetStore.convert(path)
+            after += cls._size(os.path.dirname(path))
+            if remove:
+                os.remove(path)
+
+        table = PrettyTable(["Metric", "Value"])
+        table.align["Metric"] = "l"
+        table.align["Value"] = "r"
+        table.add_row(["Problems", f"{len(paths):,}"])
+        table.add_row(["JSON (MB)", f"{before / (1 << 20):,.1f}"])
+        table.add_row(["Store (MB)", f"{after / (1 << 20):,.1f}"])
+        table.add_row(["Ratio", f"{after / before:.2f}" if before else "n/a"])
+        print(table)
+        return len(paths)
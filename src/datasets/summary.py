@@ -1,9 +1,10 @@
-import json
 import os
 from collections import defaultdict
 
 from prettytable import PrettyTable
 
+from src.utils import DatasetStore
+
 
 class DatasetSummary:
     DATA_DIR = "data"
@@ -14,7 +15,7 @@ class DatasetSummary:
             print(f"No data directory found at '{cls.DATA_DIR}'.")
             return
 
-        problems = sorted(os.listdir(cls.DATA_DIR))
+        problems = DatasetStore.find(cls.DATA_DIR)
         if not problems:
             print("No problems found.")
             return
@@ -26,27 +27,15 @@ class DatasetSummary:
         lang_counts: dict[str, int] = defaultdict(int)
         n_problems = 0
 
-        for problem_dir in problems:
-            path = os.path.join(cls.DATA_DIR, problem_dir, "dataset.json")
-            if not os.path.isfile(path):
-                continue
-
-            with open(path, "r", encoding="utf-8") as f:
-                dataset = json.load(f)
-
-            subs = dataset.get("submissions", [])
-            mismatches = set(dataset.get("mismatches", []))
-            subs = [s for s in subs if s["id"] not in mismatches]
-            tests = dataset.get("test_cases", [])
-
-            n_problems += 1
-            total_subs += len(subs)
-            total_tests += len(tests)
-
-            for s in subs:
-                verdict_counts[s["status"]] += 1
-                lang_counts[s["ext"]] += 1
-                total_loc += s.get("code", "").count("\n") + 1
+        for path in problems:
+            with DatasetStore(path) as store:
+                n_problems += 1
+                total_tests += len(store.test_cases())
+                for s in store.submissions():
+                    total_subs += 1
+                    verdict_counts[s["status"]] += 1
+                    lang_counts[s["ext"]] += 1
+                    total_loc += s.get("code", "").count("\n") + 1
 
         avg_loc = total_loc / total_subs if total_subs else 0
         langs = ", ".join(
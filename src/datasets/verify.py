@@ -1,95 +1,137 @@
-import glob
+import hashlib
 import json
 import os
-from collections import defaultdict
+import queue
+import sqlite3
+import time
+from collections import defaultdict, deque
+from dataclasses import dataclass, field
+from fnmatch import fnmatch
 from pathlib import Path
 from tqdm import tqdm
 from prettytable import PrettyTable
 
-from src.execution.tester import Tester
-from src.utils import Loader
+from src.execution import Tester, Baselines, Program, Result, Results, ResultTable, Status, TestcaseResult
+from src.utils import DatasetStore, Loader
+
+
+def _digest(code: str) -> str:
+    return hashlib.blake2b(code.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class VerifyCheckpoint:
+    """Per-submission verification outcomes, committed as each program finishes.
+
+    Rows are keyed by the problem's test context (test cases, limits,
+    machine) and the code digest, so an interrupted verify resumes with
+    the programs it had not finished, and a changed problem is verified
+    anew. Each row keeps the per-test status/runtime/memory, from which
+    the plain baselines are built without re-running.
+    """
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.db = sqlite3.connect(path)
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS outcomes "
+            "(context TEXT, digest TEXT, tests TEXT NOT NULL, PRIMARY KEY (context, digest))")
+
+    def get(self, context: str, digest: str) -> list | None:
+        row = self.db.execute(
+            "SELECT tests FROM outcomes WHERE context = ? AND digest = ?", (context, digest)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, context: str, digest: str, results: Results) -> list:
+        tests = [[tr.result.status, tr.result.runtime, tr.result.memory] for tr in results]
+        with self.db:
+            self.db.execute("INSERT OR REPLACE INTO outcomes VALUES (?, ?, ?)",
+                            (context, digest, json.dumps(tests)))
+        return tests
+
+    def clear(self):
+        with self.db:
+            self.db.execute("DELETE FROM outcomes")
+
+    def close(self):
+        self.db.close()
+
+
+@dataclass
+class _Problem:
+    path: str
+    id: str
+    context: str
+    testcases: list
+    remaining: int
+    mismatches: list = field(default_factory=list)
+
 
 class DatasetVerifier:
+    DATA_DIR = "data"
+    CHECKPOINT = ".cache/verify.db"
+    IN_FLIGHT = 4  # programs queued per worker, across problems
+
+    @classmethod
+    def select(cls, problems: list[str] | None) -> list[str]:
+        """Problem files whose directory matches any of *problems* (IDs or shell patterns, e.g. "17*")."""
+        paths = DatasetStore.find(cls.DATA_DIR)
+        if not problems:
+            return paths
+        patterns = [problem.replace("/", "_") for problem in problems]
+        return [path for path in paths if any(fnmatch(Path(path).parts[-2], p) for p in patterns)]
+
+    @staticmethod
+    def context() -> str:
+        return f"{ResultTable.context(False)}-{Baselines.fingerprint()}"
+
+    @staticmethod
+    def _results(testcases: list, tests: list) -> Results:
+        return Results([
+            TestcaseResult(testcase=tc, result=Result(status=status, stdout="", stderr="", runtime=runtime, memory=memory))
+            for tc, (status, runtime, memory) in zip(testcases, tests)
+        ])
+
     @classmethod
-    def run(cls, problem: str | None = None):
-        paths = sorted(glob.glob(os.path.join("data", "*", "dataset.json")))
+    def run(cls, problems: list[str] | None = None, workers: int | None = None, restart: bool = False):
+        paths = cls.select(problems)
         if not paths:
-            print(f"No dataset.json files found under data")
+            print(f"No datasets found under {cls.DATA_DIR}" if not problems
+                  else f"No dataset found for problem {', '.join(problems)}")
             return {}
 
-        if problem:
-            safe = problem.replace("/", "_")
-            paths = [path for path in paths if Path(path).parts[-2] == safe]
-            if not paths:
-                print(f"No dataset.json found for problem {problem}")
-                return {}
+        checkpoint = VerifyCheckpoint(cls.CHECKPOINT)
+        if restart:
+            checkpoint.clear()
+        stats = {
+            "total": 0, "matched": 0, "resumed": 0,
+            "per_verdict": defaultdict(lambda: {"match": 0, "total": 0}),
+            "per_ext": defaultdict(lambda: {"match": 0, "total": 0}),
+        }
+        Tester.open_pool(workers)
+        try:
+            started = time.perf_counter()
+            cls._verify(paths, checkpoint, stats, (workers or os.cpu_count()) * cls.IN_FLIGHT)
+            wall = time.perf_counter() - started
+            cls._baselines(paths, checkpoint)
+        finally:
+            Tester.close_pool()
+            checkpoint.close()
 
-        total = matched = 0
+        total, matched, resumed = stats["total"], stats["matched"], stats["resumed"]
+        per_verdict, per_ext = stats["per_verdict"], stats["per_ext"]
+        throughput = (total - resumed) / wall if wall else 0.0
         pct = lambda m, t: f"{m/t*100:.1f}%" if t else "n/a"
-        per_verdict = defaultdict(lambda: {"match": 0, "total": 0})
-        per_ext = defaultdict(lambda: {"match": 0, "total": 0})
-
-        loader = Loader()
-        for path in paths:
-            assignment, timelimit, memlimit, buggys, references, testcases = \
-                loader.run(path)
-            Tester.init_globals(testcases, timelimit, memlimit)
-            tot = len(buggys)+len(references)
-            pbar = tqdm(total=tot, desc=assignment['id'])
-            mismatches = []
-            stored = "failed"
-            for bug in buggys:
-                ext = bug.ext
-                results = Tester.run(bug)
-                passed = Tester.is_all_pass(results)
-
-                total += 1
-                per_verdict[stored]["total"] += 1
-                per_ext[ext]["total"] += 1
-
-                if not passed:
-                    matched += 1
-                    per_verdict[stored]["match"] += 1
-                    per_ext[ext]["match"] += 1
-                else:
-                    mismatches.append(bug.id)
-                pbar.update(1)
-                pbar.set_postfix({"match": f"{pct(tot-len(mismatches), tot)}"})
-
-            stored = "passed"
-            for ref in references:
-                ext = ref.ext
-                results = Tester.run(ref)
-                passed = Tester.is_all_pass(results)
-
-                total += 1
-                per_verdict[stored]["total"] += 1
-                per_ext[ext]["total"] += 1
-
-                if passed:
-                    matched += 1
-                    per_verdict[stored]["match"] += 1
-                    per_ext[ext]["match"] += 1
-                else:
-                    mismatches.append(ref.id)
-                pbar.update(1)
-                pbar.set_postfix({"match": f"{pct(tot-len(mismatches), tot)}"})
-            pbar.close()
-            
-            with open(path, 'r') as f:
-                dataset = json.load(f)
-            existing = dataset.get('mismatches', [])
-            dataset['mismatches'] = list(set(existing) | set(mismatches))
-            with open(path, 'w') as f:
-                json.dump(dataset, f, indent=4)
 
         overview = PrettyTable(["Metric", "Value"])
         overview.align["Metric"] = "l"
         overview.align["Value"] = "r"
         overview.add_row(["Problems", len(paths)])
         overview.add_row(["Submissions", total])
+        overview.add_row(["Resumed", resumed])
         overview.add_row(["Matched", f"{matched} ({pct(matched, total)})"])
         overview.add_row(["Mismatched", f"{total - matched} ({pct(total - matched, total)})"])
+        overview.add_row(["Wall (s)", f"{wall:.1f}"])
+        overview.add_row(["Submissions/sec", f"{throughput:.2f}"])
         print(overview)
 
         verdict_table = PrettyTable(["Verdict", "Total", "Match", "Accuracy"])
@@ -119,6 +161,121 @@ class DatasetVerifier:
             "submissions": total,
             "matched": matched,
             "mismatched": total - matched,
+            "resumed": resumed,
+            "throughput": throughput,
             "per_verdict": dict(per_verdict),
             "per_ext": dict(per_ext),
         }
+
+    @classmethod
+    def _verify(cls, paths: list[str], checkpoint: VerifyCheckpoint, stats: dict, window: int):
+        """Run every unverified program on the shared pool, at most *window* at a time.
+
+        Problems are loaded one at a time as the queue drains, so programs
+        of the next problem fill the pool while the last ones of the
+        previous problem finish. Outcomes are checkpointed per program and
+        a problem's mismatches are stored as soon as its last program is in.
+        """
+        loader = Loader()
+        problems = iter(paths)
+        pending = deque()  # (problem, program, expected to pass)
+        waiting = {}  # (context, digest) -> [(problem, program, expected to pass)]
+        done = queue.Queue()
+        pbar = tqdm(total=len(paths), desc="Verifying", unit="problem")
+        started = time.perf_counter()
+
+        def resolve(problem: _Problem, program: Program, expect: bool, tests: list):
+            passed = all(status == Status.PASSED for status, _, _ in tests)
+            stored = "passed" if expect else "failed"
+            stats["total"] += 1
+            stats["per_verdict"][stored]["total"] += 1
+            stats["per_ext"][program.ext]["total"] += 1
+            if passed == expect:
+                stats["matched"] += 1
+                stats["per_verdict"][stored]["match"] += 1
+                stats["per_ext"][program.ext]["match"] += 1
+            else:
+                problem.mismatches.append(program.id)
+            problem.remaining -= 1
+            if not problem.remaining:
+                finish(problem)
+
+        def finish(problem: _Problem):
+            with DatasetStore(problem.path) as store:
+                store.add_mismatches(problem.mismatches)
+            executed = stats["total"] - stats["resumed"]
+            pbar.update(1)
+            pbar.set_postfix({
+                "match": f"{stats['matched'] / stats['total'] * 100:.1f}%" if stats["total"] else "n/a",
+                "subs/s": f"{executed / (time.perf_counter() - started):.2f}",
+            })
+
+        def load() -> bool:
+            """Queue the next problem's programs; False once every problem is loaded."""
+            path = next(problems, None)
+            if path is None:
+                return False
+            assignment, timelimit, memlimit, buggys, references, testcases = loader.run(path)
+            Tester.init_globals(testcases, timelimit, memlimit)
+            programs = [(p, False) for p in buggys] + [(p, True) for p in references]
+            problem = _Problem(path, assignment["id"], cls.context(), list(testcases), len(programs))
+            pending.extend((problem, p, expect) for p, expect in programs)
+            if not programs:
+                finish(problem)
+            return True
+
+        in_flight = 0
+        try:
+            while True:
+                while in_flight < window:
+                    # A problem without programs (e.g. all mismatched) is finished by load() and queues nothing
+                    if not pending:
+                        if not load():
+                            break
+                        continue
+                    problem, program, expect = pending.popleft()
+                    key = (problem.context, _digest(program.code))
+                    tests = checkpoint.get(*key)
+                    if tests is not None:
+                        stats["resumed"] += 1
+                        resolve(problem, program, expect, tests)
+                        continue
+                    waiting.setdefault(key, []).append((problem, program, expect))
+                    if len(waiting[key]) == 1:
+                        # pending only ever holds the problem init_globals() was last called for
+                        Tester.submit(program.code,
+                                      callback=lambda results, key=key: done.put((key, results)),
+                                      error_callback=lambda exc, key=key: done.put((key, exc)))
+                        in_flight += 1
+                if not in_flight:
+                    break
+
+                key, results = done.get()
+                in_flight -= 1
+                if isinstance(results, BaseException):
+                    raise results
+                tests = checkpoint.put(*key, results)
+                for problem, program, expect in waiting.pop(key):
+                    resolve(problem, program, expect, tests)
+        finally:
+            pbar.close()
+
+    @classmethod
+    def _baselines(cls, paths: list[str], checkpoint: VerifyCheckpoint):
+        """Store the baselines of every verified problem, reusing the checkpointed plain runs."""
+        loader = Loader()
+        for path in tqdm(paths, desc="Baselines", unit="problem"):
+            assignment, timelimit, memlimit, buggys, references, testcases = loader.run(path)
+            Tester.init_globals(testcases, timelimit, memlimit)
+            context, testcases = cls.context(), list(testcases)
+            for program in list(buggys) + list(references):
+                tests = checkpoint.get(context, _digest(program.code))
+                if tests is not None:
+                    program.results = cls._results(testcases, tests)
+
+            # Baselines are keyed by the updated file; loaded programs exclude its mismatches
+            Baselines.set(path, assignment["id"])
+            Baselines.table(list(buggys), "buggys")
+            Baselines.table(list(references), "references")
+            Baselines.table([Program(id=p.id, code=p.code, ext=p.ext) for p in references],
+                            "references", profiling=True)
@@ -1,4 +1,7 @@
 from .testcases import TestCases, TestCase
 from .program import Program, Programs
 from .results import Result, TestcaseResult, Results
-from .tester import Tester, Status
\ No newline at end of file
+from .tester import Tester, Status
+from .screening import Screener
+from .table import ResultTable
+from .baselines import Baselines
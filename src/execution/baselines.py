@@ -0,0 +1,66 @@
+import hashlib
+import os
+import platform
+
+from .program import Program
+from .table import ResultTable
+
+
+class Baselines:
+    """Per-problem reference and buggy test outcomes, measured once and reused by every run.
+
+    Tables are stored under DIR, keyed by the content hash of the dataset
+    file and a fingerprint of the machine, since runtimes and memory are
+    only comparable on the hardware that measured them. `dataset.py
+    verify` produces them; selection and reporting load them with
+    table(), which only executes programs the store does not hold yet.
+    """
+
+    DIR = ".cache/baselines"
+
+    dataset = None
+    problem = ""
+    _hashes = {}
+
+    @classmethod
+    def set(cls, dataset:str|None, problem:str):
+        cls.dataset = dataset
+        cls.problem = problem.replace("/", "_")
+
+    @staticmethod
+    def fingerprint() -> str:
+        cpu = platform.processor()
+        try:
+            with open("/proc/cpuinfo") as f:
+                cpu = next((line.split(":", 1)[1].strip() for line in f if line.startswith("model name")), cpu)
+        except OSError:
+            pass
+        parts = [platform.system(), platform.machine(), cpu, os.cpu_count(),
+                 platform.python_implementation(), platform.python_version()]
+        return hashlib.blake2b(repr(parts).encode("utf-8"), digest_size=8).hexdigest()
+
+    @classmethod
+    def dataset_hash(cls, path:str) -> str:
+        stat = os.stat(path)
+        key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+        if key not in cls._hashes:
+            digest = hashlib.blake2b(digest_size=8)
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(chunk)
+            cls._hashes[key] = digest.hexdigest()
+        return cls._hashes[key]
+
+    @classmethod
+    def path(cls, kind:str, profiling:bool=False) -> str|None:
+        """Store for *kind* ("references" / "buggys") of the current problem; None without a dataset."""
+        if cls.dataset is None or not os.path.exists(cls.dataset):
+            return None
+        mode = "profiled" if profiling else "plain"
+        return os.path.join(
+            cls.DIR, cls.problem,
+            f"{cls.dataset_hash(cls.dataset)}-{cls.fingerprint()}.{kind}.{mode}.npz")
+
+    @classmethod
+    def table(cls, programs:list[Program], kind:str, profiling:bool=False, workers:int|None=None) -> ResultTable:
+        return ResultTable(programs, profiling, cls.path(kind, profiling), workers)
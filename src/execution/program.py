@@ -1,8 +1,9 @@
+import hashlib
 from dataclasses import dataclass, field
 
 from .results import Results
     
-@dataclass
+@dataclass(slots=True)
 class Program:
     id:str = field(metadata={"desc":"Unique identifier for the program"})
     code:str = field(metadata={"desc":"Source code of the program"})
@@ -12,21 +13,48 @@ class Program:
     fitness:dict = field(default=None, metadata={"desc":"Current fitness {f_fail, f_time, f_mem}"})
     prev_fitness:dict = field(default=None, metadata={"desc":"Previous generation fitness for Δ calculation"})
     strategy:str = field(default=None, metadata={"desc":"Edit strategy assigned by SUS: f_fail | f_time | f_mem"})
+    _normalized:str = field(default=None, init=False, repr=False, compare=False, metadata={"desc":"Cached ETC.normalize_code(code)"})
+    _digest:str = field(default=None, init=False, repr=False, compare=False, metadata={"desc":"Cached digest of (ext, normalized code)"})
+    
+    def __setattr__(self, name, value):
+        if name == "code":
+            # Invalidate cached normalization when the source changes
+            object.__setattr__(self, "_normalized", None)
+            object.__setattr__(self, "_digest", None)
+        object.__setattr__(self, name, value)
+    
+    @property
+    def normalized(self) -> str:
+        if self._normalized is None:
+            from ..utils import ETC
+            self._normalized = ETC.normalize_code(self.code)
+        return self._normalized
+    
+    @property
+    def digest(self) -> str:
+        if self._digest is None:
+            h = hashlib.blake2b(digest_size=16)
+            h.update(str(self.ext).encode("utf-8"))
+            h.update(b"\0")
+            h.update(self.normalized.encode("utf-8"))
+            self._digest = h.hexdigest()
+        return self._digest
     
     def __hash__(self):
-        from ..utils import ETC
-        return hash((ETC.normalize_code(self.code), self.ext))
+        return hash(self.digest)
     
     def __eq__(self, other):
         if not isinstance(other, Program) or self.ext != other.ext:
             return False
-        from ..utils import ETC
-        return ETC.normalize_code(self.code) == ETC.normalize_code(other.code)
+        return self.digest == other.digest
     
     
 class Programs:
     def __init__(self, programs:list[Program]=[]):
         self.programs = [p for p in sorted(programs, key=lambda x: x.id)]
+        self._index = {}
+        for prog in self.programs:
+            self._index.setdefault(prog.id, prog)
         self.current_index = 0
         
     def __iter__(self):
@@ -64,16 +92,18 @@ class Programs:
         return [prog.id for prog in self.programs]
     
     def get_prog_by_id(self, id:int) -> Program:
-        for prog in self.programs:
-            if prog.id == id:
-                return prog
-        raise IndexError
+        prog = self._index.get(id)
+        if prog is None:
+            raise IndexError
+        return prog
     
     def extend(self, programs:list[Program]):
-        self.programs.extend(programs)
+        for prog in programs:
+            self.append(prog)
     
     def append(self, program:Program):
         self.programs.append(program)
+        self._index.setdefault(program.id, program)
     
     def copy(self) -> 'Programs':
         return Programs(self.programs.copy())
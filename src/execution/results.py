@@ -1,7 +1,7 @@
 import re
 import statistics
 from dataclasses import dataclass, field
-from .testcases import TestCase
+from .testcases import TestCase, truncate
 
 
 @dataclass
@@ -13,7 +13,30 @@ class Result:
     memory:float = field(default=0.0, metadata={"desc":"Memory usage in megabytes"})
     profile:dict = field(default_factory=dict, metadata={"desc":"Line-level profile: {lineno: {hits, runtime, memory, statement}}"})
     
-    def time_report(self) -> str:
+    @staticmethod
+    def _hot_lines(weights: dict, top_k: int | None) -> set | None:
+        """The *top_k* heaviest line numbers, or None to keep every line."""
+        if top_k is None or len(weights) <= top_k:
+            return None
+        return set(sorted(weights, key=lambda k: -weights[k])[:top_k])
+
+    @staticmethod
+    def _compact(sorted_lines: list, hot: set | None, render, collapsed) -> list[str]:
+        """Render hot lines in order; each run of cold lines becomes one marker row."""
+        lines, cold = [], []
+        for lineno in sorted_lines:
+            if hot is None or lineno in hot:
+                if cold:
+                    lines.append(collapsed(cold))
+                    cold = []
+                lines.append(render(lineno))
+            else:
+                cold.append(lineno)
+        if cold:
+            lines.append(collapsed(cold))
+        return lines
+
+    def time_report(self, top_k: int | None = None) -> str:
         if not self.profile:
             return ""
 
@@ -35,23 +58,28 @@ class Result:
             f"{'% Time':>8}  Line Contents\n"
             f"{'=' * 80}"
         )
-        lines = [header]
-
-        for lineno in sorted_lines:
+        def render(lineno):
             entry = self.profile[lineno]
             hits = entry["hits"]
             runtime = entry["runtime"]
             stmt = entry.get("statement", "")
             per_hit = runtime / hits if hits else 0.0
             pct_time = (runtime / total_runtime * 100) if total_runtime else 0.0
-            lines.append(
+            return (
                 f"{lineno:>8}  {hits:>6d}  {fmt_time(runtime):>12}  {fmt_time(per_hit):>12}  "
                 f"{pct_time:>7.1f}%  {stmt}"
             )
 
+        def collapsed(cold):
+            runtime = sum(self.profile[k]["runtime"] for k in cold)
+            pct_time = (runtime / total_runtime * 100) if total_runtime else 0.0
+            return f"{'...':>8}  [{len(cold)} cold lines collapsed, {pct_time:.1f}% time]"
+
+        hot = self._hot_lines({k: e["runtime"] for k, e in self.profile.items()}, top_k)
+        lines = [header] + self._compact(sorted_lines, hot, render, collapsed)
         return "\n".join(lines)
 
-    def mem_report(self) -> str:
+    def mem_report(self, top_k: int | None = None) -> str:
         if not self.profile:
             return ""
 
@@ -69,20 +97,27 @@ class Result:
             f"{'Line #':>8}  {'Mem usage':>12}  {'Increment':>12}  {'Occurrences':>6}  Line Contents\n"
             f"{'=' * 75}"
         )
-        lines = [header]
+        increments = {}
         prev_mem = 0.0
-
         for lineno in sorted_lines:
+            increments[lineno] = self.profile[lineno]["memory"] - prev_mem
+            prev_mem = self.profile[lineno]["memory"]
+
+        def render(lineno):
             entry = self.profile[lineno]
             hits = entry["hits"]
             memory = entry["memory"]
             stmt = entry.get("statement", "")
-            increment = memory - prev_mem
-            lines.append(
-                f"{lineno:>8}  {fmt_mem(memory):>12}  {fmt_mem(increment):>12}  {hits:>6d}  {stmt}"
+            return (
+                f"{lineno:>8}  {fmt_mem(memory):>12}  {fmt_mem(increments[lineno]):>12}  {hits:>6d}  {stmt}"
             )
-            prev_mem = memory
 
+        def collapsed(cold):
+            increment = sum(increments[k] for k in cold)
+            return f"{'...':>8}  [{len(cold)} cold lines collapsed, {fmt_mem(increment)} net increment]"
+
+        hot = self._hot_lines({k: abs(v) for k, v in increments.items()}, top_k)
+        lines = [header] + self._compact(sorted_lines, hot, render, collapsed)
         return "\n".join(lines)
         
     def profile_report(self) -> str:
@@ -177,17 +212,18 @@ class Results:
             return Results(self.ts[idx])
         return self.ts[idx]
     
-    def __print(self, tr:TestcaseResult) -> str:
+    def __print(self, tr:TestcaseResult, max_chars:int|None=None) -> str:
         from .tester import Status
-        prints = f"[Input]\n{tr.testcase.input}\n[/Input]\n\n"
-        prints += f"[Expected]\n{tr.testcase.output}\n[/Expected]\n\n"
-        prints += f"[Actual]\n{tr.result.stdout if tr.result != Status.ERROR else tr.result.stderr}\n[/Actual]"
+        actual = tr.result.stdout if tr.result != Status.ERROR else tr.result.stderr
+        prints = f"[Input]\n{tr.testcase.view(max_chars)}\n[/Input]\n\n"
+        prints += f"[Expected]\n{truncate(tr.testcase.output, max_chars)}\n[/Expected]\n\n"
+        prints += f"[Actual]\n{truncate(actual, max_chars)}\n[/Actual]"
         return prints
     
-    def print_tc_result(self, tc:TestCase) -> str:
+    def print_tc_result(self, tc:TestCase, max_chars:int|None=None) -> str:
         for tr in self.ts:
             if tr.testcase.id == tc.id:
-                return self.__print(tr)
+                return self.__print(tr, max_chars)
         return f"No result found for TestCase ID: {tc.id}"
 
     def update(self, testcase:TestCase, result:Result):
@@ -235,29 +271,29 @@ class Results:
         """Total Memory Usage: sum of memory * runtime across all test cases (MB*s)."""
         return sum(tr.result.memory * tr.result.runtime for tr in self.ts if tr.result)
     
-    def report_time(self, tc:TestCase|None=None) -> str:
+    def report_time(self, tc:TestCase|None=None, top_k:int|None=None) -> str:
         max_runtime = 0.0
         max_runtime_tr = None
         for tr in self.ts:
             if tc and tr.testcase.id == tc.id:
-                return tr.result.time_report()
+                return tr.result.time_report(top_k)
             if tr.result and tr.result.runtime > max_runtime:
                 max_runtime = tr.result.runtime
                 max_runtime_tr = tr
         if max_runtime_tr:
-            return max_runtime_tr.result.time_report()
+            return max_runtime_tr.result.time_report(top_k)
         return f"No time report found for TestCase ID: {tc.id}"
 
-    def report_mem(self, tc:TestCase|None=None) -> str:
+    def report_mem(self, tc:TestCase|None=None, top_k:int|None=None) -> str:
         max_memory = 0.0
         max_memory_tr = None
         for tr in self.ts:
             if tc and tr.testcase.id == tc.id:
-                return tr.result.mem_report()
+                return tr.result.mem_report(top_k)
             if tr.result and tr.result.memory > max_memory:
                 max_memory = tr.result.memory
                 max_memory_tr = tr
         if max_memory_tr:
-            return max_memory_tr.result.mem_report()
+            return max_memory_tr.result.mem_report(top_k)
         return f"No memory report found for TestCase ID: {tc.id}"
     
\ No newline at end of file
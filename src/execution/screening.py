@@ -0,0 +1,217 @@
+import ast
+import importlib.util
+import sys
+from collections import Counter, defaultdict
+
+from .program import Program
+from .results import Result, Results, TestcaseResult
+from .tester import Tester, Status
+
+
+class Screener:
+    """Static pre-screening of candidates before they reach Tester.
+
+    Each check inspects the AST only; a candidate that trips one is either
+    dropped ("reject") or given synthetic ERROR results so it is dominated
+    in Pareto ranking without being executed ("deprioritize").
+
+    no_stdin         never reads standard input (opt-in: stdin can be reached
+                     in too many ways to rule out false positives)
+    no_output        never writes to standard output
+    missing_import   imports a module that is not installed
+    main_not_called  defines main() but never calls it
+    infinite_loop    `while True` with no break / return / raise / exit / yield
+    """
+
+    CHECKS = ["no_stdin", "no_output", "missing_import", "main_not_called", "infinite_loop"]
+    DEFAULT_CHECKS = ["no_output", "missing_import", "main_not_called", "infinite_loop"]
+    MODES = ["reject", "deprioritize", "off"]
+    # Reasons whose candidates would have run every test until the time limit
+    TIMEOUT_REASONS = {"infinite_loop"}
+
+    _INPUT_CALLS = {"input"}
+    _INPUT_ATTRS = {"stdin", "__stdin__", "buffer", "readline", "readlines"}
+    _OUTPUT_CALLS = {"print"}
+    _OUTPUT_ATTRS = {"stdout", "__stdout__", "write", "writelines"}
+    # Calls that reach a raw file descriptor given as their first argument, e.g. os.read(0, n), open(0)
+    _FD_CALLS = {"open", "fdopen", "FileIO", "read", "readv", "write", "writev"}
+    _EXIT_CALLS = {"exit", "quit", "_exit"}
+
+    _spec_cache: dict[str, bool] = {}
+
+    def __init__(self, mode: str = "deprioritize", checks: list[str] | None = None):
+        assert mode in self.MODES, f"Unknown screening mode: {mode}"
+        self.mode = mode
+        self.checks = set(self.DEFAULT_CHECKS if checks is None else checks)
+        self.stats = defaultdict(lambda: {
+            "screened": 0, "flagged": 0,
+            "executions_saved": 0, "timeout_seconds_saved": 0.0,
+            "reasons": Counter(),
+        })
+
+    # ------------------------------------------------------------------ #
+    # Checks                                                             #
+    # ------------------------------------------------------------------ #
+
+    @classmethod
+    def _module_available(cls, name: str) -> bool:
+        top = name.split(".", 1)[0]
+        if top not in cls._spec_cache:
+            if top in sys.builtin_module_names:
+                cls._spec_cache[top] = True
+            else:
+                try:
+                    cls._spec_cache[top] = importlib.util.find_spec(top) is not None
+                except (ImportError, ValueError):
+                    cls._spec_cache[top] = False
+        return cls._spec_cache[top]
+
+    @classmethod
+    def _call_name(cls, node: ast.Call) -> str | None:
+        func = node.func
+        if isinstance(func, ast.Name):
+            return func.id
+        if isinstance(func, ast.Attribute):
+            return func.attr
+        return None
+
+    @classmethod
+    def _loop_escapes(cls, loop: ast.While) -> bool:
+        """True if the loop body contains a statement that can leave it, or hand control back (yield)."""
+        stack = [(node, False) for node in loop.body]
+        while stack:
+            node, nested = stack.pop()
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef, ast.Lambda)):
+                continue
+            # A break inside a nested loop only leaves that loop
+            if isinstance(node, ast.Break) and not nested:
+                return True
+            # A generator's consumer decides when to stop pulling, e.g. a stdin token reader
+            if isinstance(node, (ast.Return, ast.Raise, ast.Yield, ast.YieldFrom)):
+                return True
+            if isinstance(node, ast.Call) and cls._call_name(node) in cls._EXIT_CALLS:
+                return True
+            inner = nested or isinstance(node, (ast.For, ast.AsyncFor, ast.While))
+            stack.extend((child, inner) for child in ast.iter_child_nodes(node))
+        return False
+
+    def _reason(self, tree: ast.Module) -> str | None:
+        reads = writes = calls_main = False
+        defines_main = any(
+            isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) and node.name == "main"
+            for node in tree.body
+        )
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Call):
+                name = self._call_name(node)
+                if name in self._INPUT_CALLS:
+                    reads = True
+                elif name in self._OUTPUT_CALLS:
+                    writes = True
+                elif name in self._FD_CALLS and node.args and isinstance(node.args[0], ast.Constant) \
+                        and node.args[0].value in (0, 1):
+                    reads = reads or node.args[0].value == 0
+                    writes = writes or node.args[0].value == 1
+            elif isinstance(node, ast.Attribute):
+                if node.attr in self._INPUT_ATTRS:
+                    reads = True
+                if node.attr in self._OUTPUT_ATTRS:
+                    writes = True
+            elif isinstance(node, ast.Name):
+                # Aliases such as `input = sys.stdin.readline`
+                if node.id in ("stdin", "fileinput"):
+                    reads = True
+                elif node.id == "stdout":
+                    writes = True
+                # Any reference counts, e.g. Thread(target=main)
+                elif node.id == "main":
+                    calls_main = True
+            elif isinstance(node, (ast.Import, ast.ImportFrom)):
+                if isinstance(node, ast.ImportFrom):
+                    modules = [node.module] if node.module and not node.level else []
+                else:
+                    modules = [alias.name for alias in node.names]
+                for module in modules:
+                    if module == "fileinput":
+                        reads = True
+                    if "missing_import" in self.checks and not self._module_available(module):
+                        return "missing_import"
+            elif isinstance(node, ast.While) and "infinite_loop" in self.checks:
+                test = node.test
+                if isinstance(test, ast.Constant) and test.value and not self._loop_escapes(node):
+                    return "infinite_loop"
+
+        if "main_not_called" in self.checks and defines_main and not calls_main:
+            return "main_not_called"
+        if "no_stdin" in self.checks and not reads:
+            return "no_stdin"
+        if "no_output" in self.checks and not writes:
+            return "no_output"
+        return None
+
+    # ------------------------------------------------------------------ #
+    # Public API                                                         #
+    # ------------------------------------------------------------------ #
+
+    def _deprioritize(self, program: Program, reason: str):
+        """Attach synthetic ERROR results so Tester.run never executes it."""
+        program.results = Results([
+            TestcaseResult(
+                testcase=tc,
+                result=Result(
+                    status=Status.ERROR,
+                    stdout="",
+                    stderr=f"Screened: {reason}",
+                    runtime=Tester.timelimit,
+                    memory=Tester.memlimit,
+                ),
+            )
+            for tc in Tester.testcases
+        ])
+
+    def screen(self, program: Program, gen: int = 0) -> bool:
+        """Return True if *program* should be dropped before execution.
+
+        The reason is recorded in ``program.meta["screen"]``.
+        """
+        if self.mode == "off" or program.ext != "py" or program.results is not None:
+            return False
+        try:
+            tree = ast.parse(program.code)
+        except Exception:
+            return False
+        reason = self._reason(tree)
+
+        stats = self.stats[gen]
+        stats["screened"] += 1
+        if reason is None:
+            return False
+
+        program.meta["screen"] = reason
+        n_tests = len(Tester.testcases)
+        stats["flagged"] += 1
+        stats["reasons"][reason] += 1
+        stats["executions_saved"] += n_tests
+        if reason in self.TIMEOUT_REASONS:
+            stats["timeout_seconds_saved"] += n_tests * Tester.timelimit
+
+        if self.mode == "deprioritize":
+            self._deprioritize(program, reason)
+            return False
+        return True
+
+    def report(self) -> list[list]:
+        """Per-generation rows: [gen, screened, flagged, executions saved, timeout-s saved, reasons]."""
+        rows = []
+        for gen in sorted(self.stats):
+            s = self.stats[gen]
+            reasons = ", ".join(f"{r}={c}" for r, c in s["reasons"].most_common())
+            rows.append([
+                gen, s["screened"], s["flagged"],
+                s["executions_saved"], f"{s['timeout_seconds_saved']:.1f}",
+                reasons or "-",
+            ])
+        return rows
+
+    def reset(self):
+        self.stats.clear()
@@ -0,0 +1,172 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from .program import Program
+from .results import Results
+from .tester import Tester, Status
+
+# Set bits per byte value
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def popcount(bits: np.ndarray) -> np.ndarray:
+    """Set bits per row of a packed bitset array."""
+    return _POPCOUNT[bits].sum(axis=-1, dtype=np.int64)
+
+
+def _digest(text: str) -> str:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class ResultTable:
+    """Test outcomes of a fixed program set (e.g. the references), computed once per problem.
+
+    Row i holds program i's pass bitset and per-test runtime/memory, with
+    one bit/column per test case in Tester.testcases order. Matching a
+    buggy program against every row is then a popcount over packed bits.
+    With *cache_path*, rows are persisted by program code and only
+    programs missing from the file are executed on later runs over the
+    same test cases and limits.
+    """
+
+    def __init__(
+        self,
+        programs: list[Program],
+        profiling: bool = False,
+        cache_path: str | None = None,
+        workers: int | None = None,
+    ):
+        self.programs = list(programs)
+        self.ids = [p.id for p in self.programs]
+        self.index = {id: i for i, id in enumerate(self.ids)}
+        self.columns = {tc.id: j for j, tc in enumerate(Tester.testcases)}
+        self._strength = {}
+
+        context = self.context(profiling)
+        stored = self._load(cache_path, context)
+        digests = [_digest(p.code) for p in self.programs]
+        missing = [p for p, d in zip(self.programs, digests) if d not in stored]
+        for p, results in zip(missing, Tester.run_many(missing, profiling, workers)):
+            stored[_digest(p.code)] = self.row(results)
+        self.measured = len(missing)
+        if missing:
+            self._save(cache_path, context, stored)
+
+        self.valid, self.passed, self.runtime, self.memory = self._stack(
+            [stored[d] for d in digests])
+
+    def __len__(self):
+        return len(self.programs)
+
+    def _stack(self, rows: list[tuple]) -> tuple[np.ndarray, ...]:
+        width = len(self.columns)
+        bits = (len(rows), (width + 7) // 8)
+        return (
+            np.array([r[0] for r in rows], dtype=np.uint8).reshape(bits),
+            np.array([r[1] for r in rows], dtype=np.uint8).reshape(bits),
+            np.array([r[2] for r in rows], dtype=float).reshape(len(rows), width),
+            np.array([r[3] for r in rows], dtype=float).reshape(len(rows), width),
+        )
+
+    @staticmethod
+    def context(profiling: bool) -> str:
+        """Digest of the current test cases, limits and profiling mode the rows are valid for."""
+        return _digest(json.dumps([
+            [[tc.id, tc.input, tc.output] + ([os.path.basename(tc.input_file)] if tc.input_file else [])
+             for tc in Tester.testcases],
+            Tester.timelimit, Tester.memlimit, profiling,
+        ]))
+
+    def _load(self, path: str | None, context: str) -> dict:
+        if path is None or not os.path.exists(path):
+            return {}
+        try:
+            with np.load(path) as data:
+                if str(data["context"]) != context:
+                    return {}
+                return {
+                    str(d): row for d, *row in zip(
+                        data["digests"], data["valid"], data["passed"],
+                        data["runtime"], data["memory"])
+                }
+        except Exception:
+            return {}
+
+    def _save(self, path: str | None, context: str, stored: dict):
+        if path is None:
+            return
+        valid, passed, runtime, memory = self._stack(list(stored.values()))
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp.npz"
+        np.savez(tmp, context=context, digests=np.array(list(stored), dtype=str),
+                 valid=valid, passed=passed, runtime=runtime, memory=memory)
+        os.replace(tmp, path)
+
+    def row(self, results: Results) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """(packed valid bits, packed pass bits, runtime, memory) of one program's results.
+
+        A test without a result is invalid, and its runtime/memory is NaN.
+        """
+        width = len(self.columns)
+        valid = np.zeros(width, dtype=bool)
+        passed = np.zeros(width, dtype=bool)
+        runtime = np.full(width, np.nan)
+        memory = np.full(width, np.nan)
+        for tr in results:
+            j = self.columns[tr.testcase.id]
+            passed[j] = tr.result is not None and tr.result.status == Status.PASSED
+            if tr.result is None:
+                continue
+            valid[j] = True
+            runtime[j] = tr.result.runtime
+            memory[j] = tr.result.memory
+        return np.packbits(valid), np.packbits(passed), runtime, memory
+
+    def metrics(self, id: str) -> tuple[float, float, float]:
+        """(ET, MU, TMU) of one row, as Results.ET / MU / TMU compute them."""
+        i = self.index[id]
+        mask = np.unpackbits(self.valid[i], count=len(self.columns)).astype(bool)
+        runtime, memory = self.runtime[i][mask].tolist(), self.memory[i][mask].tolist()
+        return sum(runtime), max(memory, default=0.0), sum(m * r for m, r in zip(memory, runtime))
+
+    def match(self, results: Results) -> np.ndarray:
+        """Dice overlap of passed tests, 2|A ∩ B| / (|A| + |B|), against every row (0 when both are empty)."""
+        _, passed, _, _ = self.row(results)
+        both = popcount(self.passed & passed)
+        denom = popcount(self.passed) + popcount(passed)
+        return np.divide(2 * both, denom, out=np.zeros(len(self), dtype=float), where=denom != 0)
+
+    def thresholds(self) -> tuple[float, float]:
+        """Median per-test runtime and memory over every row."""
+        mask = np.unpackbits(self.valid, axis=1, count=len(self.columns)).astype(bool)
+        if not mask.any():
+            return 0.0, 0.0
+        return float(np.median(self.runtime[mask])), float(np.median(self.memory[mask]))
+
+    def _sets(self, valid, passed, runtime, memory, strategy, theta_time, theta_mem, weak):
+        # Weakness (weak=True) or strength set of the given rows, as packed bits
+        if strategy == "f_fail":
+            return valid & (~passed if weak else passed)
+        values, theta = (runtime, theta_time) if strategy == "f_time" else (memory, theta_mem)
+        with np.errstate(invalid="ignore"):
+            hit = values > theta if weak else values <= theta
+        return valid & np.packbits(hit, axis=-1)
+
+    def complementarity(
+        self, results: Results, strategy: str, theta_time: float, theta_mem: float
+    ) -> np.ndarray:
+        """Fraction of the program's weak tests that each row handles well (0 without weak tests)."""
+        valid, passed, runtime, memory = self.row(results)
+        weak = self._sets(valid, passed, runtime, memory, strategy, theta_time, theta_mem, True)
+        n_weak = int(popcount(weak))
+        if not n_weak:
+            return np.zeros(len(self))
+        key = (strategy, theta_time, theta_mem)
+        if key not in self._strength:
+            self._strength[key] = self._sets(
+                self.valid, self.passed, self.runtime, self.memory,
+                strategy, theta_time, theta_mem, False)
+        return popcount(self._strength[key] & weak) / n_weak
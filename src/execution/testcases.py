@@ -1,22 +1,62 @@
+import mmap
+import os
 from dataclasses import dataclass
 
+
+def truncate(text:str, max_chars:int|None=None) -> str:
+    """Keep the head and tail of *text* with an explicit marker in between."""
+    if max_chars is None or text is None or len(text) <= max_chars:
+        return text
+    head = max_chars // 2
+    tail = max_chars - head
+    return f"{text[:head]}\n... [truncated {len(text) - max_chars} chars] ...\n{text[-tail:] if tail else ''}"
+
+def truncate_file(path:str, max_chars:int|None=None, strip:bool=False) -> str:
+    """truncate() of a UTF-8 file, decoding only the head and tail through mmap (sizes count bytes)."""
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if not size:
+            return ""
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            if max_chars is None or size <= max_chars:
+                text = data[:].decode("utf-8")
+                return text.strip() if strip else text
+            head = max_chars // 2
+            tail = max_chars - head
+            first = data[:head].decode("utf-8", "ignore")
+            last = data[size - tail:].decode("utf-8", "ignore") if tail else ""
+    if strip:
+        first, last = first.lstrip(), last.rstrip()
+    return f"{first}\n... [truncated {size - max_chars} chars] ...\n{last}"
+
 @dataclass
 class TestCase:
     id: int
     input: str
     output: str
+    input_file: str|None = None  # externalized input; `input` is empty and the file is never loaded whole
     
     def __hash__(self):
-        return hash((self.id, self.input, self.output))
+        return hash((self.id, self.input, self.output, self.input_file))
     
     def __eq__(self, other):
         if not isinstance(other, TestCase):
             return False
-        return self.id == other.id and self.input == other.input and self.output == other.output
+        return self.id == other.id and self.input == other.input and self.output == other.output \
+            and self.input_file == other.input_file
+
+    def view(self, max_chars:int|None=None, strip:bool=False) -> str:
+        """The input cut to *max_chars*, whether inline or externalized."""
+        if self.input_file is not None:
+            return truncate_file(self.input_file, max_chars, strip)
+        return truncate(self.input.strip() if strip else self.input, max_chars)
     
     def __str__(self):
-        prints = f'## Input:\n```\n{self.input.strip()}\n```\n'
-        prints += f'## Output:\n```\n{self.output.strip()}\n```\n'
+        return self.render()
+
+    def render(self, max_chars:int|None=None) -> str:
+        prints = f'## Input:\n```\n{self.view(max_chars, strip=True)}\n```\n'
+        prints += f'## Output:\n```\n{truncate(self.output.strip(), max_chars)}\n```\n'
         return prints
 
 class TestCases:
@@ -39,9 +79,16 @@ class TestCases:
         return len(self.testcases)
     
     def __str__(self):
+        return self.render()
+
+    def render(self, max_cases:int|None=None, max_chars:int|None=None) -> str:
+        """Render the first *max_cases* test cases, each field cut to *max_chars*."""
+        shown = self.testcases if max_cases is None else self.testcases[:max_cases]
         prints = ''
-        for tc in self.testcases:
-            prints += str(tc) + '\n'
+        for tc in shown:
+            prints += tc.render(max_chars) + '\n'
+        if len(shown) < len(self.testcases):
+            prints += f'[... {len(self.testcases) - len(shown)} more test cases omitted ...]\n'
         return prints.strip()
     
     def __getitem__(self, idx):
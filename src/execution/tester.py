@@ -5,7 +5,6 @@ import multiprocessing
 import tempfile
 import warnings
 from decimal import Decimal, InvalidOperation
-from functools import cache
 
 from .program import Program
 from .results import Result, Results, TestcaseResult
@@ -49,6 +48,7 @@ def main():
 
     code = payload.get("code", "")
     input_tc = payload.get("input", "")
+    input_file = payload.get("input_file")
     memlimit = float(payload.get("memlimit", 64))
     profiling = bool(payload.get("profiling", False))
 
@@ -87,11 +87,15 @@ def main():
     old_stdin = sys.stdin
     old_stdout = sys.stdout
     old_stderr = sys.stderr
-    tmp_stdin = tempfile.TemporaryFile(mode="w+", encoding="utf-8")
+    if input_file:
+        # Externalized inputs are read straight from the dataset's blob file
+        tmp_stdin = open(input_file, "r", encoding="utf-8")
+    else:
+        tmp_stdin = tempfile.TemporaryFile(mode="w+", encoding="utf-8")
+        tmp_stdin.write(input_tc)
+        tmp_stdin.seek(0)
     tmp_stdout = tempfile.TemporaryFile(mode="w+", encoding="utf-8")
     tmp_stderr = tempfile.TemporaryFile(mode="w+", encoding="utf-8")
-    tmp_stdin.write(input_tc)
-    tmp_stdin.seek(0)
     sys.stdin = tmp_stdin
     sys.stdout = tmp_stdout
     sys.stderr = tmp_stderr
@@ -142,6 +146,10 @@ if __name__ == "__main__":
 """
 
 class Tester:
+    cpu_seconds = 0.0
+    _results = {}
+    _pool = None
+
     @classmethod
     def init_globals(
         cls,
@@ -152,7 +160,7 @@ class Tester:
         cls.testcases = testcases
         cls.timelimit = timelimit + 0.5
         cls.memlimit = memlimit + 1
-        cls._run_cache.cache_clear()
+        cls._results = {}
 
     @classmethod
     def tests_split(cls, results: Results) -> tuple[set[TestCase], set[TestCase]]:
@@ -215,12 +223,15 @@ class Tester:
     
     
     @classmethod
-    def _profiler(cls, code: str, input_tc: str, profiling: bool) -> tuple:
+    def _profiler(
+        cls, code: str, tc: TestCase, profiling: bool, timelimit: float, memlimit: float
+    ) -> tuple:
         payload = json.dumps(
             {
                 "code": code,
-                "input": input_tc,
-                "memlimit": cls.memlimit,
+                "input": tc.input,
+                "input_file": tc.input_file,
+                "memlimit": memlimit,
                 "profiling": profiling,
             },
             ensure_ascii=False,
@@ -228,8 +239,8 @@ class Tester:
 
         status = None
         stdout = stderr = ""
-        runtime = cls.timelimit
-        memory = cls.memlimit
+        runtime = timelimit
+        memory = memlimit
         profile = {}
         try:
             with tempfile.TemporaryDirectory() as tmpdir:
@@ -238,7 +249,7 @@ class Tester:
                     input=payload,
                     text=True,
                     capture_output=True,
-                    timeout=cls.timelimit*5 if profiling else cls.timelimit,
+                    timeout=timelimit*5 if profiling else timelimit,
                     check=False,
                     cwd=tmpdir,
                 )
@@ -262,10 +273,11 @@ class Tester:
         return status, stdout, stderr, profile, runtime, memory
 
     @classmethod
-    def _validation(cls, args:tuple[str, TestCase, bool]) -> TestcaseResult:
-        code, tc, profiling = args
+    def _validation(cls, args:tuple[str, TestCase, bool, float, float]) -> TestcaseResult:
+        # Limits travel with each task, since a shared pool outlives init_globals()
+        code, tc, profiling, timelimit, memlimit = args
         status, stdout, stderr, profile, runtime, memory = \
-            cls._profiler(code, tc.input, profiling)
+            cls._profiler(code, tc, profiling, timelimit, memlimit)
         if status is None:
             if cls.__is_equal(tc.output, stdout):
                 status = Status.PASSED
@@ -284,13 +296,68 @@ class Tester:
         )
     
     @classmethod
-    @cache
+    def open_pool(cls, workers: int | None = None):
+        """Run every later batch on one pool of *workers* processes, across problems, until close_pool()."""
+        if cls._pool is None:
+            cls._pool = multiprocessing.Pool(processes=workers or multiprocessing.cpu_count())
+        return cls._pool
+
+    @classmethod
+    def close_pool(cls):
+        if cls._pool is not None:
+            cls._pool.terminate()
+            cls._pool.join()
+            cls._pool = None
+
+    @classmethod
+    def _tasks(cls, codes: list[str], profiling: bool) -> list[tuple]:
+        return [(code, tc, profiling, cls.timelimit, cls.memlimit) for code in codes for tc in cls.testcases]
+
+    @classmethod
+    def _run_batch(cls, codes: list[str], profiling: bool = False, workers: int | None = None):
+        # Test cases of every program share one pool, so short programs do not leave cores idle
+        args = cls._tasks(codes, profiling)
+        results = []
+        if args and cls._pool is not None:
+            results = cls._pool.map(cls._validation, args)
+        elif args:
+            processes = min(len(args), workers or multiprocessing.cpu_count())
+            with multiprocessing.Pool(processes=processes) as pool:
+                results = pool.map(cls._validation, args)
+        cls.cpu_seconds += sum(tr.result.runtime for tr in results)
+        n = len(cls.testcases)
+        for i, code in enumerate(codes):
+            cls._results[(code, profiling)] = Results(results[i * n:(i + 1) * n])
+
+    @classmethod
     def _run_cache(cls, code: str, profiling: bool = False) -> Results:
-        args = [(code, tc, profiling) for tc in cls.testcases]
-        processes = min(len(args), multiprocessing.cpu_count())
-        with multiprocessing.Pool(processes=processes) as pool:
-            results = pool.map(cls._validation, args)
-        return Results(results)
+        if (code, profiling) not in cls._results:
+            cls._run_batch([code], profiling)
+        return cls._results[(code, profiling)]
+
+    @classmethod
+    def submit(cls, code: str, callback, error_callback=None, profiling: bool = False):
+        """Queue every test case of *code* on the shared pool; *callback* receives its Results.
+
+        The current test cases and limits are captured at submission, so
+        programs of several problems can be in flight at once. Callbacks
+        run on the pool's result thread.
+        """
+        def done(results):
+            cls.cpu_seconds += sum(tr.result.runtime for tr in results)
+            callback(Results(results))
+        return cls.open_pool().map_async(
+            cls._validation, cls._tasks([code], profiling), callback=done, error_callback=error_callback)
+
+    @classmethod
+    def run_many(cls, programs: list[Program], profiling: bool = False, workers: int | None = None) -> list[Results]:
+        """Run every program not executed yet in a single pool of *workers* (default: CPU count)."""
+        pending = list(dict.fromkeys(
+            p.code for p in programs
+            if p.results is None and (p.code, profiling) not in cls._results))
+        if pending:
+            cls._run_batch(pending, profiling, workers)
+        return [cls.run(p, profiling) for p in programs]
 
     @classmethod
     def run(cls, program: Program, profiling: bool = False) -> Results:
@@ -1,3 +1,4 @@
 from .fitness import Fitness
 from .variation import Variation
-from .selection import Selection
\ No newline at end of file
+from .selection import Selection
+from .archive import ParetoArchive
\ No newline at end of file
@@ -0,0 +1,87 @@
+import math
+
+from .fitness import Fitness
+from ..execution import Program, Tester
+
+
+class ParetoArchive:
+    """Elitist archive of non-dominated programs with incremental hypervolume.
+
+    Objectives (f_fail, f_time, f_mem) are normalised to [0, 1] by 1, the
+    time limit and the memory limit; f_time / f_mem are ∞ for incorrect
+    programs and are clipped to 1. The reference point is 1 + margin on
+    every axis so that reducing f_fail still adds volume before any program
+    passes all tests.
+
+    Adding a point p to archive A increases the hypervolume by
+        vol(p, ref) - HV({max(a, p) : a ∈ A}, ref)
+    so the total is maintained without recomputing HV(A ∪ {p}).
+    """
+
+    OBJECTIVES = ["f_fail", "f_time", "f_mem"]
+
+    def __init__(self, margin: float = 0.1):
+        self.ref = (1.0 + margin,) * 3
+        self.members: list[tuple[tuple, Program]] = []
+        self.hypervolume = 0.0
+
+    def __len__(self):
+        return len(self.members)
+
+    def __iter__(self):
+        return iter(p for _, p in self.members)
+
+    def _point(self, program: Program) -> tuple:
+        fitness = program.fitness or Fitness.evaluate(program)
+        scales = (1.0, Tester.timelimit, Tester.memlimit)
+        point = []
+        for key, scale in zip(self.OBJECTIVES, scales):
+            value = fitness[key]
+            if math.isinf(value):
+                value = 1.0
+            point.append(min(value / scale, 1.0) if scale else 1.0)
+        return tuple(point)
+
+    @staticmethod
+    def _dominates(a: tuple, b: tuple) -> bool:
+        """Weak dominance: a is no worse than b on every objective."""
+        return all(x <= y for x, y in zip(a, b))
+
+    @staticmethod
+    def _hv2d(points: list[tuple], ref: tuple) -> float:
+        volume, best_y = 0.0, ref[1]
+        for x, y in sorted(points):
+            if y < best_y:
+                volume += (ref[0] - x) * (best_y - y)
+                best_y = y
+        return volume
+
+    @classmethod
+    def _hv3d(cls, points: list[tuple], ref: tuple) -> float:
+        """Exact 3-D hypervolume by slicing along the first objective."""
+        points = sorted(p for p in points if all(v < r for v, r in zip(p, ref)))
+        volume = 0.0
+        for i, p in enumerate(points):
+            upper = points[i + 1][0] if i + 1 < len(points) else ref[0]
+            if upper <= p[0]:
+                continue
+            front = [q[1:] for q in points[:i + 1]]
+            volume += (upper - p[0]) * cls._hv2d(front, ref[1:])
+        return volume
+
+    def add(self, program: Program) -> float:
+        """Insert *program* if non-dominated; return the hypervolume gain."""
+        p = self._point(program)
+        if any(self._dominates(q, p) for q, _ in self.members):
+            return 0.0
+        box = math.prod(r - v for v, r in zip(p, self.ref))
+        clipped = [tuple(max(a, b) for a, b in zip(q, p)) for q, _ in self.members]
+        gain = max(box - self._hv3d(clipped, self.ref), 0.0)
+        self.members = [(q, m) for q, m in self.members if not self._dominates(p, q)]
+        self.members.append((p, program))
+        self.hypervolume += gain
+        return gain
+
+    def update(self, programs: list[Program]) -> float:
+        """Insert every program; return the total hypervolume gain."""
+        return sum(self.add(program) for program in programs)
@@ -6,7 +6,7 @@ from pymoo.algorithms.moo.nsga2 import NSGA2
 from pymoo.core.population import Population
 
 from .fitness import Fitness
-from ..execution import Program, TestCase, Status, Tester
+from ..execution import Program, TestCase, Status, Tester, ResultTable
 from ..utils import ETC, Randoms
 
 class Selection:
@@ -223,7 +223,9 @@ class Selection:
             self._complementarity(p1, p2, strategy, theta_time, theta_mem)
             for p2 in candidates
         ]
+        return self._rank_sample(candidates, scores, n)
 
+    def _rank_sample(self, candidates: list[Program], scores: list[float], n: int) -> Program | None:
         # Rank-based weights (rank 1 = highest complementarity)
         order = sorted(range(len(candidates)), key=lambda i: -scores[i])
         weights = [0.0] * len(candidates)
@@ -290,14 +292,34 @@ class Selection:
     # Reference selection                                              #
     # ---------------------------------------------------------------- #
     
-    def one(self, buggy: Program, references: list[Program]) -> Program:
+    def one(self, buggy: Program, references: list[Program], table: ResultTable | None = None) -> Program:
         """Select a single reference program from the provided list."""
+        return self.many(buggy, references, 1, table)[0]
+
+    def many(
+        self, buggy: Program, references: list[Program], k: int, table: ResultTable | None = None
+    ) -> list[Program]:
+        """Select *k* references; thresholds and per-strategy complementarity are computed once.
+
+        *table* holds the references' test outcomes; pass one built per
+        problem to reuse it across buggies.
+        """
         if self.rand: # Random selection
-            return Randoms.choice(references)
-        self.repair_strategy([buggy])
-        theta_time, theta_mem = self._compute_thresholds(references)
-        p2 = self._get_pair(buggy, references, buggy.strategy, theta_time, theta_mem, len(references)+1)
-        return p2
+            return [Randoms.choice(references) for _ in range(k)]
+        if table is None:
+            table = ResultTable(references, profiling=True)
+        theta_time, theta_mem = table.thresholds()
+        results = Tester.run(buggy, profiling=True)
+        scores = {}
+        selected = []
+        for _ in range(k):
+            self.repair_strategy([buggy])
+            strategy = buggy.strategy
+            if strategy not in scores:
+                scores[strategy] = table.complementarity(
+                    results, strategy, theta_time, theta_mem).tolist()
+            selected.append(self._rank_sample(table.programs, scores[strategy], len(table)+1))
+        return selected
 
     # ---------------------------------------------------------------- #
     # Final solution selection                                         #
@@ -1,8 +1,10 @@
+import time
 import asyncio
 from tqdm.asyncio import tqdm as tqdm_async
 
 from ..execution import Program, TestCase, Tester
 from ..llms import prompts
+from ..llms.budget import Compaction, PromptBudget
 
 
 class Variation:
@@ -10,11 +12,14 @@ class Variation:
         self.description = assignment.get("description", "")
         self.input_format = assignment.get("input_format", "")
         self.output_format = assignment.get("output_format", "")
-    
+
     # ---- prompt builders ----------------------------------------- #
+    # Builders take a Compaction so PromptBudget.fit can rebuild them
+    # with shorter profiles / test payloads when over the token budget.
 
-    async def _correct_prompt(self, buggy: Program, reference: Program) -> tuple[str, str]:
-        from ..llms import Models
+    def _correct_prompt(
+        self, buggy: Program, reference: Program, c: Compaction = Compaction(),
+    ) -> tuple[str, str]:
         system = prompts.PAR_SYSTEM
         user = prompts.PAR_USER.format(
             description=self.description,
@@ -23,30 +28,27 @@ class Variation:
             buggy_program=buggy.code,
             reference_program=reference.code,
         )
-        return await Models.run(system, user)
-    
-    async def _efficient_prompt(self, correct: Program) -> tuple[str, str]:
-        from ..llms import Models
-        results = Tester.run(correct, profiling=True)
+        return system, user
+
+    def _efficient_prompt(self, correct: Program, results, c: Compaction = Compaction()) -> tuple[str, str]:
         system = prompts.EFFILEARNER_SYSTEM
         user = prompts.EFFILEARNER_USER.format(
             description=self.description,
             input_format=self.input_format,
             output_format=self.output_format,
-            test_case=str(Tester.testcases),
+            test_case=Tester.testcases.render(c.max_cases, c.max_chars),
             original_code=correct.code,
             total_memory_usage=results.mem_usage(),
             total_execution_time=results.exec_time(),
             max_memory_usage=results.mem_usage_max(),
-            line_profiler_results=results.report_time(),
-            memory_report=results.report_mem()
+            line_profiler_results=results.report_time(top_k=c.top_k),
+            memory_report=results.report_mem(top_k=c.top_k)
         )
-        return await Models.run(system, user)
+        return system, user
 
-    async def _crossover_prompt(
-        self, p1: Program, p2: Program, tc: TestCase
+    def _crossover_prompt(
+        self, p1: Program, p2: Program, tc: TestCase, c: Compaction = Compaction(),
     ) -> tuple[str, str]:
-        from ..llms import Models
         strategy = p1.strategy or "f_fail"
         if strategy == "f_fail":
             system = prompts.CROSS_FAIL_SYSTEM
@@ -54,34 +56,33 @@ class Variation:
                 description=self.description,
                 input_format=self.input_format,
                 output_format=self.output_format,
-                test_case=str(p1.results.print_tc_result(tc)),
+                test_case=str(p1.results.print_tc_result(tc, c.max_chars)),
                 p1_code=p1.code,
                 p2_code=p2.code,
             )
         elif strategy == "f_time":
             system = prompts.CROSS_TIME_SYSTEM
             user = prompts.CROSS_TIME_USER.format(
-                test_case=str(p1.results.print_tc_result(tc)),
+                test_case=str(p1.results.print_tc_result(tc, c.max_chars)),
                 p1_code=p1.code,
-                p1_profile=p1.results.report_time(tc),
+                p1_profile=p1.results.report_time(tc, c.top_k),
                 p2_code=p2.code,
-                p2_profile=p2.results.report_time(tc)
+                p2_profile=p2.results.report_time(tc, c.top_k)
             )
         else:  # f_mem
             system = prompts.CROSS_MEM_SYSTEM
             user = prompts.CROSS_MEM_USER.format(
-                test_case=str(p1.results.print_tc_result(tc)),
+                test_case=str(p1.results.print_tc_result(tc, c.max_chars)),
                 p1_code=p1.code,
-                p1_profile=p1.results.report_mem(tc),
+                p1_profile=p1.results.report_mem(tc, c.top_k),
                 p2_code=p2.code,
-                p2_profile=p2.results.report_mem(tc)
+                p2_profile=p2.results.report_mem(tc, c.top_k)
             )
-        return await Models.run(system, user), p1.fitness, p1.ext
-    
-    async def _mutation_prompt(
-        self, p1: Program, tc: TestCase, 
+        return system, user
+
+    def _mutation_prompt(
+        self, p1: Program, tc: TestCase, c: Compaction = Compaction(),
     ) -> tuple[str, str]:
-        from ..llms import Models
         strategy = p1.strategy or "f_fail"
         if strategy == "f_fail":
             system = prompts.MUT_FAIL_SYSTEM
@@ -89,7 +90,7 @@ class Variation:
                 description=self.description,
                 input_format=self.input_format,
                 output_format=self.output_format,
-                test_case=str(p1.results.print_tc_result(tc)),
+                test_case=str(p1.results.print_tc_result(tc, c.max_chars)),
                 code=p1.code
             )
         elif strategy == "f_time":
@@ -98,7 +99,7 @@ class Variation:
                 description=self.description,
                 input_format=self.input_format,
                 output_format=self.output_format,
-                profile=p1.results.report_time(tc),
+                profile=p1.results.report_time(tc, c.top_k),
                 code=p1.code
             )
         else:  # f_mem
@@ -107,23 +108,51 @@ class Variation:
                 description=self.description,
                 input_format=self.input_format,
                 output_format=self.output_format,
-                profile=p1.results.report_mem(tc),
+                profile=p1.results.report_mem(tc, c.top_k),
                 code=p1.code
             )
-        return await Models.run(system, user), p1.fitness, p1.ext
+        return system, user
 
     # ---- async orchestration ------------------------------------- #
 
+    async def _dispatch(self, requests: list[tuple[str, str]], desc: str):
+        """Yield (index, patch) as completions arrive.
+
+        Identical (system, user) prompts are grouped and sent as one
+        n-choice request whose choices are fanned back out to their indices.
+        """
+        from ..llms import Models
+        groups = {}
+        for i, prompt in enumerate(requests):
+            groups.setdefault(prompt, []).append(i)
+
+        async def _group(prompt: tuple[str, str], indices: list[int]):
+            return indices, await Models.run_n(*prompt, n=len(indices))
+
+        tasks = [asyncio.create_task(_group(prompt, indices))
+            for prompt, indices in groups.items()]
+
+        start = time.monotonic()
+        pbar = tqdm_async(total=len(requests), desc=desc, leave=False, position=2)
+        for coro in asyncio.as_completed(tasks):
+            indices, patches = await coro
+            pbar.update(len(indices))
+            for i, patch in zip(indices, patches):
+                yield i, patch
+        pbar.close()
+        # Wall-clock of the whole batch, i.e. until its slowest request returned
+        if requests:
+            Models.batches.setdefault(desc, []).append(time.monotonic() - start)
+
     async def _run_correct_async(self, buggy: Program, references: list[Program]) -> list[Program]:
         """Generate *count* initial candidates (syntax-only validation done in GA)."""
-        tasks = [asyncio.create_task(self._correct_prompt(buggy, reference)) 
-            for reference in references]
+        requests = [
+            PromptBudget.fit(lambda c: self._correct_prompt(buggy, reference, c))
+            for reference in references
+        ]
 
         programs = []
-        pbar = tqdm_async(total=len(tasks), desc="Correct", leave=False, position=2)
-        for coro in asyncio.as_completed(tasks):
-            patch: str | None = await coro
-            pbar.update(1)
+        async for _, patch in self._dispatch(requests, "Correct"):
             if patch is None or not patch.strip():
                 continue
             programs.append(
@@ -133,19 +162,18 @@ class Variation:
                     ext=buggy.ext,
                 )
             )
-        pbar.close()
         return programs
 
     async def _run_efficient_async(self, corrects: list[Program]) -> list[Program]:
         """Generate candidates for EffiLearner (validation passed in PaR)."""
-        tasks = [asyncio.create_task(self._efficient_prompt(correct)) 
-            for correct in corrects]
+        requests = []
+        for correct in corrects:
+            results = Tester.run(correct, profiling=True)
+            requests.append(PromptBudget.fit(
+                lambda c: self._efficient_prompt(correct, results, c)))
 
         programs = []
-        pbar = tqdm_async(total=len(tasks), desc="Efficient", leave=False, position=2)
-        for coro in asyncio.as_completed(tasks):
-            patch: str | None = await coro
-            pbar.update(1)
+        async for _, patch in self._dispatch(requests, "Efficient"):
             if patch is None or not patch.strip():
                 continue
             programs.append(
@@ -155,38 +183,35 @@ class Variation:
                     ext="py",
                 )
             )
-        pbar.close()
         return programs
-    
+
     async def _run_variation_async(self, pairs: list[tuple]) -> list[Program]:
         """Generate one crossover + one mutation offspring per pair."""
-        tasks = []
+        requests, parents = [], []
 
         for p1, p2, t_star in pairs:
             if t_star is None:
                 continue
-            # Crossover task
-            tasks.append(asyncio.create_task(
-                self._crossover_prompt(p1, p2, t_star)))
-            # Mutation task
-            tasks.append(asyncio.create_task(
-                self._mutation_prompt(p1, t_star)))
+            # Crossover prompt
+            requests.append(PromptBudget.fit(
+                lambda c: self._crossover_prompt(p1, p2, t_star, c)))
+            parents.append(p1)
+            # Mutation prompt
+            requests.append(PromptBudget.fit(
+                lambda c: self._mutation_prompt(p1, t_star, c)))
+            parents.append(p1)
 
         programs = []
-        pbar = tqdm_async(total=len(tasks), desc="Variation", leave=False, position=2)
-        for coro in asyncio.as_completed(tasks):
-            patch, fitness, ext = await coro
-            pbar.update(1)
+        async for i, patch in self._dispatch(requests, "Variation"):
             if patch is None or not patch.strip():
                 continue
             child = Program(
                 id=f"child_{len(programs) + 1}",
                 code=patch,
-                ext=ext,
+                ext=parents[i].ext,
             )
-            child.prev_fitness = fitness
+            child.prev_fitness = parents[i].fitness
             programs.append(child)
-        pbar.close()
         return programs
 
     # ---- public API ---------------------------------------------- #
@@ -1,3 +1,6 @@
 from .models import Models
 from .tokenizer import Tokenizer
+from .cache import ResponseCache, CacheMiss
+from .budget import PromptBudget, Compaction
+from .telemetry import Telemetry, CallRecord
 from . import prompts
\ No newline at end of file
@@ -0,0 +1,222 @@
+import asyncio
+import hashlib
+import random
+import re
+from dataclasses import dataclass, field
+
+from openai import AsyncOpenAI
+
+from . import prompts
+
+
+class TransientBackendError(Exception):
+    """Retryable failure raised by non-OpenAI backends (e.g. injected by MockBackend)."""
+
+
+@dataclass
+class Completion:
+    contents:list = field(metadata={"desc":"One text per returned choice"})
+    usage:dict = field(default_factory=dict, metadata={"desc":"Provider token usage, empty when not reported"})
+
+
+class OpenAIBackend:
+    """OpenAI API, or any OpenAI-compatible server (vLLM, Ollama, ...) via *base_url*."""
+
+    def __init__(self, api_key: str | None = None, base_url: str | None = None, timeout: int = 60):
+        # Local servers usually ignore the key but the client requires one
+        if base_url and not api_key:
+            api_key = "EMPTY"
+        # Retries are handled in Models.run so they are counted and rate limited
+        self.client = AsyncOpenAI(api_key=api_key, base_url=base_url, timeout=timeout, max_retries=0)
+        # prompt_cache_key is OpenAI-only; compatible servers may reject unknown fields
+        self.cache_routing = base_url is None
+
+    def _extra(self, n: int, cache_key: str | None) -> dict:
+        extra = {"n": n} if n > 1 else {}
+        if cache_key and self.cache_routing:
+            # Routes requests sharing a prefix to the same cache shard
+            extra["prompt_cache_key"] = cache_key
+        return extra
+
+    @staticmethod
+    def _usage(usage) -> dict:
+        if usage is None:
+            return {}
+        details = getattr(usage, "prompt_tokens_details", None)
+        return {
+            "prompt_tokens": usage.prompt_tokens,
+            "completion_tokens": usage.completion_tokens,
+            "cached_tokens": getattr(details, "cached_tokens", None) or 0,
+        }
+
+    async def complete(
+        self, model: str, system: str, user: str,
+        n: int, temperature: float, timeout: int,
+        cache_key: str | None = None,
+    ) -> Completion:
+        response = await self.client.chat.completions.parse(
+            model=model,
+            messages=[
+                { "role": "system", "content": system },
+                { "role": "user", "content": user }
+            ],
+            temperature=temperature,
+            timeout=timeout,
+            **self._extra(n, cache_key),
+        )
+        return Completion([choice.message.content for choice in response.choices], self._usage(response.usage))
+
+    async def stream(
+        self, model: str, system: str, user: str,
+        n: int, temperature: float, timeout: int,
+        cache_key: str | None = None,
+    ):
+        """Yield (choice index, text delta); closing the generator aborts the request."""
+        stream = await self.client.chat.completions.create(
+            model=model,
+            messages=[
+                { "role": "system", "content": system },
+                { "role": "user", "content": user }
+            ],
+            temperature=temperature,
+            timeout=timeout,
+            stream=True,
+            **self._extra(n, cache_key),
+        )
+        try:
+            async for chunk in stream:
+                for choice in chunk.choices:
+                    if choice.delta.content:
+                        yield choice.index, choice.delta.content
+        finally:
+            await stream.close()
+
+
+class MockBackend:
+    """Offline deterministic stand-in for an LLM.
+
+    The reply depends only on (seed, system, user, occurrence index), so
+    reruns are reproducible. Per prompt type it returns:
+
+    PaR          the reference program
+    EffiLearner  the original program
+    CROSS_*      program B
+    MUT_*        the original program
+
+    With probability *mutate_rate* a small operator/constant edit is
+    applied, so some candidates fail. Latency is log-normal around
+    *latency* seconds, and a *failure_rate* fraction of calls raise
+    TransientBackendError. *responses* maps a prompt type to a fixed
+    reply that overrides the rules above.
+
+    Usage reports cached prompt tokens the way provider prefix caching
+    would: the longest previously seen prefix, in 128-token blocks and
+    only from 1024 tokens on (tokens estimated as 4 chars).
+    """
+
+    CACHE_BLOCK = 512
+    CACHE_MIN = 4096
+
+    _BLOCKS = {
+        "PaR": r"\[Reference Code\]\n(.*?)\n\[End of Reference Code\]",
+        "EffiLearner": r"Original Code:\n```python\n(.*?)\n```",
+        "CROSS": r"#+ Program B\n```python\n(.*?)\n```",
+        "MUT": r"# Original Code\n```python\n(.*?)\n```",
+    }
+    _MUTATIONS = [("<=", "<"), ("<", "<="), (">=", ">"), (">", ">="), ("+ 1", "- 1"), ("- 1", "+ 1"), ("==", "!=")]
+
+    def __init__(
+        self,
+        seed: int = 0,
+        latency: float = 0.0,
+        latency_sigma: float = 0.5,
+        failure_rate: float = 0.0,
+        mutate_rate: float = 0.0,
+        responses: dict[str, str] | None = None,
+    ):
+        self.seed = seed
+        self.latency = latency
+        self.latency_sigma = latency_sigma
+        self.failure_rate = failure_rate
+        self.mutate_rate = mutate_rate
+        self.responses = responses or {}
+        self._counts: dict[str, int] = {}
+        self._prefixes: set[bytes] = set()
+
+    def _rng(self, system: str, user: str) -> random.Random:
+        digest = hashlib.sha256(f"{self.seed}\0{system}\0{user}".encode("utf-8")).hexdigest()
+        index = self._counts.get(digest, 0)
+        self._counts[digest] = index + 1
+        return random.Random(f"{digest}:{index}")
+
+    def _cached_tokens(self, system: str, user: str) -> int:
+        text = f"{system}\0{user}".encode("utf-8")
+        chain = hashlib.sha256()
+        cached, seen = 0, []
+        for end in range(self.CACHE_BLOCK, len(text) + 1, self.CACHE_BLOCK):
+            chain.update(text[end - self.CACHE_BLOCK:end])
+            digest = chain.digest()
+            if digest in self._prefixes:
+                cached = end
+            seen.append(digest)
+        self._prefixes.update(seen)
+        return cached // 4 if cached >= self.CACHE_MIN else 0
+
+    def _mutate(self, code: str, rng: random.Random) -> str:
+        candidates = [(a, b) for a, b in self._MUTATIONS if a in code]
+        if not candidates:
+            return code + "\n"
+        a, b = rng.choice(candidates)
+        positions = [m.start() for m in re.finditer(re.escape(a), code)]
+        pos = rng.choice(positions)
+        return code[:pos] + b + code[pos + len(a):]
+
+    def _reply(self, system: str, user: str, rng: random.Random) -> str:
+        kind = prompts.prompt_type(system)
+        family = kind.split("_", 1)[0]
+        if kind in self.responses:
+            return self.responses[kind]
+        if family in self.responses:
+            return self.responses[family]
+        m = re.search(self._BLOCKS.get(family, r"```python\n(.*?)\n```"), user, flags=re.DOTALL)
+        code = m.group(1) if m else ""
+        if rng.random() < self.mutate_rate:
+            code = self._mutate(code, rng)
+        return f"```python\n{code}\n```"
+
+    async def _wait(self, rng: random.Random, timeout: int):
+        if self.latency > 0:
+            delay = rng.lognormvariate(0.0, self.latency_sigma) * self.latency
+            if delay > timeout:
+                await asyncio.sleep(timeout)
+                raise TransientBackendError("mock timeout")
+            await asyncio.sleep(delay)
+        if rng.random() < self.failure_rate:
+            raise TransientBackendError("mock failure")
+
+    async def complete(
+        self, model: str, system: str, user: str,
+        n: int, temperature: float, timeout: int,
+        cache_key: str | None = None,
+    ) -> Completion:
+        rng = self._rng(system, user)
+        await self._wait(rng, timeout)
+        return Completion(
+            [self._reply(system, user, rng) for _ in range(n)],
+            {"cached_tokens": self._cached_tokens(system, user)},
+        )
+
+    async def stream(
+        self, model: str, system: str, user: str,
+        n: int, temperature: float, timeout: int,
+        cache_key: str | None = None, chunk: int = 16,
+    ):
+        """Same replies as complete(), delivered as (choice index, delta) chunks."""
+        rng = self._rng(system, user)
+        await self._wait(rng, timeout)
+        replies = [self._reply(system, user, rng) for _ in range(n)]
+        for start in range(0, max(map(len, replies)), chunk):
+            for index, reply in enumerate(replies):
+                if start < len(reply):
+                    yield index, reply[start:start + chunk]
+            await asyncio.sleep(0)
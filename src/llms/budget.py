@@ -0,0 +1,86 @@
+from collections import defaultdict
+from dataclasses import dataclass, field
+
+from .prompts import prompt_type
+from .tokenizer import Tokenizer
+
+
+@dataclass(frozen=True)
+class Compaction:
+    top_k:int|None = field(default=None, metadata={"desc":"Hot profile lines kept per report (None = all)"})
+    max_chars:int|None = field(default=None, metadata={"desc":"Characters kept per test input/output (None = all)"})
+    max_cases:int|None = field(default=None, metadata={"desc":"Test cases listed in the prompt (None = all)"})
+
+
+class PromptBudget:
+    """Shrink prompts to a per-model token budget.
+
+    A prompt builder takes a Compaction and returns (system, user). fit()
+    builds it at the full level first and only escalates through LEVELS
+    while it exceeds the budget; the code under repair is never touched.
+    """
+
+    # Context windows (tokens); the longest matching prefix wins
+    CONTEXT = {
+        "gpt-3.5-turbo": 16385,
+        "gpt-4": 8192,
+        "gpt-4-turbo": 128000,
+        "gpt-4o": 128000,
+        "gpt-4.1": 1047576,
+        "gpt-5": 400000,
+    }
+    DEFAULT_CONTEXT = 8192
+    LEVELS = [
+        Compaction(),
+        Compaction(top_k=20, max_chars=2000, max_cases=5),
+        Compaction(top_k=10, max_chars=500, max_cases=2),
+        Compaction(top_k=5, max_chars=200, max_cases=1),
+    ]
+
+    budget = DEFAULT_CONTEXT
+    stats = defaultdict(lambda: {"prompts": 0, "compacted": 0, "over": 0, "before": 0, "after": 0})
+
+    @classmethod
+    def context(cls, model:str) -> int:
+        matches = [k for k in cls.CONTEXT if model.startswith(k)]
+        return cls.CONTEXT[max(matches, key=len)] if matches else cls.DEFAULT_CONTEXT
+
+    @classmethod
+    def set(cls, model:str="gpt-3.5-turbo", budget:int|None=None, reserve:int=4096):
+        """Budget = *budget* if given, else the context window minus *reserve* for the reply."""
+        cls.budget = budget or max(cls.context(model) - reserve, 1024)
+        cls.stats = defaultdict(lambda: {"prompts": 0, "compacted": 0, "over": 0, "before": 0, "after": 0})
+
+    @classmethod
+    def count(cls, system:str, user:str) -> int:
+        return sum(Tokenizer.count_many([system, user]))
+
+    @classmethod
+    def fit(cls, build) -> tuple[str, str]:
+        system, user = build(cls.LEVELS[0])
+        before = tokens = cls.count(system, user)
+        level = 0
+        while tokens > cls.budget and level + 1 < len(cls.LEVELS):
+            level += 1
+            system, user = build(cls.LEVELS[level])
+            tokens = cls.count(system, user)
+
+        stat = cls.stats[prompt_type(system)]
+        stat["prompts"] += 1
+        stat["compacted"] += level > 0
+        stat["over"] += tokens > cls.budget
+        stat["before"] += before
+        stat["after"] += tokens
+        return system, user
+
+    @classmethod
+    def report(cls) -> list[list]:
+        """Rows of [prompt type, #prompts, #compacted, #over budget, avg tokens before, avg tokens after]."""
+        rows = []
+        for kind, stat in sorted(cls.stats.items()):
+            n = stat["prompts"] or 1
+            rows.append([
+                kind, stat["prompts"], stat["compacted"], stat["over"],
+                f"{stat['before'] / n:.0f}", f"{stat['after'] / n:.0f}",
+            ])
+        return rows
@@ -0,0 +1,92 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+
+
+class CacheMiss(Exception): pass
+
+
+class ResponseCache:
+    """Content-addressed store of raw LLM completions.
+
+    Key = sha256(model, temperature, system, user, sample index), where the
+    sample index counts earlier requests of the same prompt in this process,
+    so the k-th identical request replays the k-th recorded sample.
+
+    Modes
+        off     no caching
+        record  always call the API and overwrite the stored response
+        replay  never call the API; a miss raises CacheMiss
+        read    read-through: serve hits, call the API and store on a miss
+
+    Backed by SQLite in WAL mode so several processes can share one file;
+    within a process a lock serialises access from asyncio tasks/threads.
+    """
+
+    MODES = ["off", "record", "replay", "read"]
+
+    def __init__(self, path: str = ".cache/llm.sqlite", mode: str = "off"):
+        assert mode in self.MODES, f"Unknown cache mode: {mode}"
+        self.path = path
+        self.mode = mode
+        self.hits = 0
+        self.misses = 0
+        self._counts: dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != "off"
+
+    def _connection(self) -> sqlite3.Connection:
+        # Reconnect after fork; sqlite connections must not cross processes
+        if self._conn is None or self._pid != os.getpid():
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=60, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, model TEXT, content TEXT)"
+            )
+            conn.commit()
+            self._conn, self._pid = conn, os.getpid()
+        return self._conn
+
+    def key(self, model: str, temperature: float, system: str, user: str) -> str:
+        """Digest of the prompt plus its occurrence index in this process."""
+        prompt = json.dumps([model, temperature, system, user], ensure_ascii=False)
+        digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        with self._lock:
+            index = self._counts.get(digest, 0)
+            self._counts[digest] = index + 1
+        return hashlib.sha256(f"{digest}:{index}".encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> str | None:
+        if self.mode not in ("replay", "read"):
+            return None
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT content FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            self.misses += 1
+            if self.mode == "replay":
+                raise CacheMiss(key)
+            return None
+        self.hits += 1
+        return row[0]
+
+    def put(self, key: str, model: str, content: str):
+        if self.mode not in ("record", "read") or content is None:
+            return
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, model, content) VALUES (?, ?, ?)",
+                (key, model, content),
+            )
+            conn.commit()
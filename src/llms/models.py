@@ -1,24 +1,160 @@
 import re
-from openai import AsyncOpenAI
+import time
+import asyncio
+import random
+from collections import Counter, deque
+
+import openai
+
+from .backends import Completion, OpenAIBackend, MockBackend, TransientBackendError
+from .cache import ResponseCache
+from .limits import TokenBucket
+from .streaming import CodeBlock
+from .tokenizer import Tokenizer
+from .telemetry import CallRecord, Telemetry
+from ..utils import ETC
+
+# Transient failures worth retrying with backoff
+RETRYABLE = (
+    openai.RateLimitError,
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.InternalServerError,
+    TransientBackendError,
+)
 
 class Models:
+    calls = 0
+    samples = 0
+    retries = 0
+    failures = 0
+    errors = Counter()
+    cache = ResponseCache()
+    backend = None
+    max_concurrency = 16
+    max_retries = 4
+    backoff_base = 1.0
+    backoff_cap = 30.0
+    rpm_bucket = None
+    tpm_bucket = None
+    supports_n = True
+    stream = False
+    ttft = []
+    ttcc = []
+    cut_early = 0
+    hedge = None
+    hedge_ratio = 0.1
+    hedge_min_samples = 20
+    hedges = 0
+    hedge_wins = 0
+    latencies = deque(maxlen=256)
+    batches = {}
+    _semaphore = None
+    _semaphore_loop = None
+    _jitter = random.Random()
+
     @classmethod
     def set(cls,
         model:str="gpt-3.5-turbo", 
         temperature:float=0.8,
-        timeout:int=60
+        timeout:int=60,
+        cache_mode:str="off",
+        cache_path:str=".cache/llm.sqlite",
+        max_concurrency:int=16,
+        rpm:int|None=None,
+        tpm:int|None=None,
+        max_retries:int=4,
+        backend:str="openai",
+        base_url:str|None=None,
+        mock:dict|None=None,
+        stream:bool=False,
+        hedge:float|None=None,
+        hedge_ratio:float=0.1,
     ):
         from dotenv import load_dotenv
         import os
         load_dotenv()
         API_KEY = os.getenv("OPENAI_API_KEY")
         
-        cls.client = AsyncOpenAI(api_key=API_KEY, timeout=timeout)
+        cls.cache = ResponseCache(cache_path, cache_mode)
+        if backend == "mock":
+            cls.backend = MockBackend(**(mock or {}))
+        elif cache_mode == "replay":
+            # Replay never reaches the API, so it must work without a key
+            cls.backend = None
+        elif backend == "local":
+            base_url = base_url or os.getenv("OPENAI_BASE_URL", "http://localhost:8000/v1")
+            cls.backend = OpenAIBackend(API_KEY, base_url, timeout)
+        else:
+            cls.backend = OpenAIBackend(API_KEY, base_url, timeout)
         cls.model = model
         if model.startswith("gpt-5"):
             temperature = 1.0
         cls.temperature = temperature
         cls.timeout = timeout
+        cls.max_concurrency = max_concurrency
+        cls.max_retries = max_retries
+        cls.rpm_bucket = TokenBucket(rpm) if rpm else None
+        cls.tpm_bucket = TokenBucket(tpm) if tpm else None
+        cls._semaphore = None
+        cls.supports_n = True
+        cls.stream = stream
+        cls.ttft, cls.ttcc, cls.cut_early = [], [], 0
+        cls.hedge = hedge
+        cls.hedge_ratio = hedge_ratio
+        cls.hedges = cls.hedge_wins = 0
+        cls.latencies = deque(maxlen=256)
+        cls.batches = {}
+        cls.calls = cls.samples = cls.retries = cls.failures = 0
+        cls.errors = Counter()
+
+    @classmethod
+    def _limiter(cls) -> asyncio.Semaphore:
+        # A semaphore is bound to the loop it is first used on
+        loop = asyncio.get_running_loop()
+        if cls._semaphore is None or cls._semaphore_loop is not loop:
+            cls._semaphore = asyncio.Semaphore(cls.max_concurrency)
+            cls._semaphore_loop = loop
+        return cls._semaphore
+
+    @classmethod
+    def _estimate_tokens(cls, system:str, user:str) -> int:
+        return sum(Tokenizer.count_many([system, user]))
+
+    @classmethod
+    def _cache_key(cls) -> str | None:
+        # Calls of one problem share their prompt prefix (see prompts.py)
+        return Telemetry.context.get("problem") or None
+
+    @classmethod
+    def _backoff(cls, attempt:int, exc:Exception) -> float:
+        """Full-jitter exponential backoff, honouring Retry-After when present."""
+        delay = cls._jitter.uniform(0, min(cls.backoff_cap, cls.backoff_base * 2 ** attempt))
+        response = getattr(exc, "response", None)
+        if response is not None:
+            try:
+                delay = max(delay, float(response.headers.get("retry-after", 0)))
+            except (TypeError, ValueError):
+                pass
+        return delay
+
+    @classmethod
+    def stats(cls) -> dict:
+        return {
+            "calls": cls.calls,
+            "samples": cls.samples,
+            "cache_hits": cls.cache.hits,
+            "retries": cls.retries,
+            "failures": cls.failures,
+            "errors": dict(cls.errors),
+            "streamed": len(cls.ttcc),
+            "cut_early": cls.cut_early,
+            "ttft": cls.ttft,
+            "ttcc": cls.ttcc,
+            "hedges": cls.hedges,
+            "hedge_wins": cls.hedge_wins,
+            "batches": cls.batches,
+        }
     
     @classmethod
     def _post_process(cls, code: str) -> str:
@@ -38,21 +174,202 @@ class Models:
         return code
         
     @classmethod
-    async def run(cls, system:str, user:str) -> str | None:
+    async def _complete(cls, system:str, user:str, n:int=1) -> tuple[list[str | None] | None, CallRecord]:
+        """One chat completion request with *n* choices and its telemetry record.
+
+        The contents are None when the request ultimately fails.
+        """
+        cls.calls += 1
+        trace = {"attempts": 0, "queue": 0.0, "latency": 0.0}
+        for attempt in range(cls.max_retries + 1):
+            try:
+                completion = await cls._hedged(system, user, n, trace)
+                record = Telemetry.record(
+                    cls.model, system, user, n, completion.contents, trace, completion.usage)
+                return completion.contents, record
+            except RETRYABLE as e:
+                cls.errors[type(e).__name__] += 1
+                if attempt == cls.max_retries:
+                    break
+                cls.retries += 1
+                await asyncio.sleep(cls._backoff(attempt, e))
+            except openai.BadRequestError as e:
+                cls.errors[type(e).__name__] += 1
+                if n > 1:
+                    # Provider rejects multi-choice requests; caller falls back
+                    cls.supports_n = False
+                break
+            except Exception as e:
+                cls.errors[type(e).__name__] += 1
+                break
+        return None, Telemetry.record(cls.model, system, user, n, None, trace)
+
+    @classmethod
+    async def _attempt(
+        cls, system:str, user:str, n:int=1, trace:dict|None=None, started:asyncio.Event|None=None,
+    ) -> Completion:
+        """Send one request through the rate limiters; *started* is set once it leaves the queue.
+
+        Queue wait and latency are accumulated into *trace*.
+        """
+        trace = trace if trace is not None else {}
+        trace["attempts"] = trace.get("attempts", 0) + 1
+        queued = time.monotonic()
+        if cls.rpm_bucket is not None:
+            await cls.rpm_bucket.acquire(1)
+        if cls.tpm_bucket is not None:
+            await cls.tpm_bucket.acquire(cls._estimate_tokens(system, user))
+        async with cls._limiter():
+            if started is not None:
+                started.set()
+            start = time.monotonic()
+            trace["queue"] = trace.get("queue", 0.0) + start - queued
+            if cls.stream:
+                result = await cls._stream(system, user, n)
+            else:
+                result = await cls.backend.complete(
+                    cls.model, system, user,
+                    n=n, temperature=cls.temperature, timeout=cls.timeout,
+                    cache_key=cls._cache_key(),
+                )
+            trace["latency"] = time.monotonic() - start
+            cls.latencies.append(trace["latency"])
+            return result
+
+    @classmethod
+    def _hedge_delay(cls) -> float | None:
+        """The hedge percentile of recent latencies, or None when no hedge may be sent."""
+        if cls.hedge is None or len(cls.latencies) < cls.hedge_min_samples:
+            return None
+        if cls.hedges >= cls.hedge_ratio * cls.calls:
+            return None
+        return ETC.percentile(cls.latencies, cls.hedge)
+
+    @classmethod
+    async def _hedged(cls, system:str, user:str, n:int=1, trace:dict|None=None) -> Completion:
+        """One attempt; if it is still running after the hedge delay, race a duplicate.
+
+        The first duplicate to succeed wins and the other is cancelled.
+        The delay is timed from when the primary is sent, not while it
+        waits for a concurrency slot.
+        """
+        if cls._hedge_delay() is None:
+            return await cls._attempt(system, user, n, trace)
+
+        started = asyncio.Event()
+        primary = asyncio.create_task(cls._attempt(system, user, n, trace, started))
+        tasks = {primary}
         try:
-            response = await cls.client.chat.completions.parse(
-                model=cls.model, 
-                messages=[
-                    { "role": "system", "content": system },
-                    { "role": "user", "content": user }
-                ],
-                temperature=cls.temperature,
-                timeout=cls.timeout,
-            )
-            content = response.choices[0].message.content
-            return cls._post_process(content)
-        except Exception as e:
-            # print(e) # DEBUG
-            pass
-        return None
-        
\ No newline at end of file
+            waiter = asyncio.create_task(started.wait())
+            await asyncio.wait({primary, waiter}, return_when=asyncio.FIRST_COMPLETED)
+            waiter.cancel()
+            delay = cls._hedge_delay()
+            if delay is not None and not primary.done():
+                await asyncio.wait({primary}, timeout=delay)
+            delay = cls._hedge_delay()
+            if primary.done() or delay is None:
+                return await primary
+
+            cls.hedges += 1
+            backup = asyncio.create_task(cls._attempt(system, user, n, trace))
+            tasks.add(backup)
+            pending, error = set(tasks), None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        cls.hedge_wins += task is backup
+                        return task.result()
+                    error = error or task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    @classmethod
+    async def _stream(cls, system:str, user:str, n:int=1) -> Completion:
+        """Stream *n* choices and stop once every choice has closed its code block.
+
+        Records time-to-first-token and time-to-code-complete per call.
+        """
+        start = time.monotonic()
+        ttft = None
+        blocks = [CodeBlock() for _ in range(n)]
+        received = 0
+        stream = cls.backend.stream(
+            cls.model, system, user,
+            n=n, temperature=cls.temperature, timeout=cls.timeout,
+            cache_key=cls._cache_key(),
+        )
+        try:
+            async for index, delta in stream:
+                if ttft is None:
+                    ttft = time.monotonic() - start
+                if index >= n:
+                    continue
+                received = max(received, index + 1)
+                blocks[index].feed(delta)
+                if all(block.complete for block in blocks):
+                    break
+        finally:
+            await stream.aclose()
+
+        cls.ttft.append(ttft if ttft is not None else time.monotonic() - start)
+        cls.ttcc.append(time.monotonic() - start)
+        cls.cut_early += all(block.complete for block in blocks)
+        # Choices the provider never sent are dropped, as in the non-streaming path
+        return Completion([block.text or None for block in blocks[:received or n]])
+
+    @classmethod
+    async def run_n(cls, system:str, user:str, n:int=1) -> list[str | None]:
+        """*n* independent samples for one prompt, requested as a single n-choice completion.
+
+        Falls back to single-choice requests when the provider rejects or
+        ignores `n`. Entries are None where no completion could be obtained.
+        """
+        outputs = [None] * n
+        keys = [None] * n
+        missing = list(range(n))
+        if cls.cache.enabled:
+            keys = [cls.cache.key(cls.model, cls.temperature, system, user) for _ in range(n)]
+            missing = []
+            for i, key in enumerate(keys):
+                cached = cls.cache.get(key)
+                if cached is not None:
+                    outputs[i] = cls._post_process(cached)
+                else:
+                    missing.append(i)
+            if len(missing) < n:
+                Telemetry.link(Telemetry.record_cached(system, n - len(missing)), outputs)
+
+        contents, records = [], []
+        if missing and (cls.supports_n or len(missing) == 1):
+            contents, record = await cls._complete(system, user, len(missing))
+            if contents is None:
+                # Only retry one-by-one if the failure was the n parameter itself
+                contents = [] if not cls.supports_n and len(missing) > 1 else [None] * len(missing)
+            elif 0 < len(contents) < len(missing):
+                cls.supports_n = False
+            records = [record] * len(contents)
+        if len(contents) < len(missing):
+            extra = await asyncio.gather(*[
+                cls._complete(system, user, 1)
+                for _ in range(len(missing) - len(contents))
+            ])
+            contents += [r[0] if r else None for r, _ in extra]
+            records += [record for _, record in extra]
+
+        for i, content, record in zip(missing, contents, records):
+            if content is None:
+                continue
+            if keys[i] is not None:
+                cls.cache.put(keys[i], cls.model, content)
+            outputs[i] = cls._post_process(content)
+            Telemetry.link(record, [outputs[i]])
+        cls.samples += n
+        cls.failures += sum(1 for out in outputs if out is None)
+        return outputs
+
+    @classmethod
+    async def run(cls, system:str, user:str) -> str | None:
+        return (await cls.run_n(system, user, 1))[0]
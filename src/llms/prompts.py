@@ -1,6 +1,11 @@
 # ================================================================== #
 # Centralized prompt templates for all LLM calls in MooRepair        #
 # ================================================================== #
+# Layout: fixed instructions and per-problem content (description,   #
+# formats) come first, per-buggy content next and per-candidate      #
+# content last, so calls within one problem share a long prefix that #
+# providers can serve from their prompt cache.                       #
+# ================================================================== #
 
 # ------------------------------------------------------------------ #
 # PaR — Peer-aided Repair                                            #
@@ -15,6 +20,8 @@ problem. Please fix the buggy code and return the correct code.
 '''
 
 PAR_USER = '''\
+Please fix the code and return the correct code.
+
 [Problem Description]
 {description}
 
@@ -24,15 +31,13 @@ PAR_USER = '''\
 [Output Format]
 {output_format}
 
-[Reference Code]
-{reference_program}
-[End of Reference Code]
-
 [Buggy Code]
 {buggy_program}
 [End of Buggy Code]
 
-Please fix the code and return the correct code.
+[Reference Code]
+{reference_program}
+[End of Reference Code]
 '''
 
 
@@ -47,6 +52,12 @@ and overhead analysis provided. Ensure the optimized code can pass the given tes
 '''
 
 EFFILEARNER_USER = '''\
+Optimization Rules:
+- Encapsulate the optimized code within a Python code block (i.e., ```python\\n[Your Code Here]\\n```).
+- Do not include the test case within the code block.
+- Focus solely on code optimization; test cases are already provided.
+- Ensure the provided test case passes with your optimized solution.
+
 Task Description:
 {description}
 
@@ -72,12 +83,6 @@ The line_profiler results are:
 {line_profiler_results}
 The memory profiler results are: 
 {memory_report}
-
-Optimization Rules:
-- Encapsulate the optimized code within a Python code block (i.e., ```python\\n[Your Code Here]\\n```).
-- Do not include the test case within the code block.
-- Focus solely on code optimization; test cases are already provided.
-- Ensure the provided test case passes with your optimized solution.
 '''
 
 
@@ -96,6 +101,9 @@ Wrap your merged code within a Python code block (i.e., ```python\\n[Your Code H
 '''
 
 CROSS_FAIL_USER = '''\
+Adopt the correct logic from the better program.
+Return ONLY the merged Python program within a Python code block (i.e., ```python\\n[Your Code Here]\\n```)
+
 # Problem Description
 {description}
 
@@ -117,9 +125,6 @@ CROSS_FAIL_USER = '''\
 ```python
 {p2_code}
 ```
-
-Adopt the correct logic from the better program.
-Return ONLY the merged Python program within a Python code block (i.e., ```python\\n[Your Code Here]\\n```)\
 '''
 
 
@@ -134,6 +139,10 @@ Wrap your merged code within a Python code block (i.e., ```python\\n[Your Code H
 '''
 
 CROSS_TIME_USER = '''\
+Adopt the faster approach from B into A's structure.
+Do not break correctness.
+Return ONLY the merged Python program within a Python code block (i.e., ```python\\n[Your Code Here]\\n```)
+
 # Failed Test Case
 {test_case}
 
@@ -153,10 +162,6 @@ CROSS_TIME_USER = '''\
 
 ## Program B Profile
 {p2_profile}
-
-Adopt the faster approach from B into A's structure.
-Do not break correctness.
-Return ONLY the merged Python program within a Python code block (i.e., ```python\\n[Your Code Here]\\n```)\
 '''
 
 
@@ -171,6 +176,10 @@ Wrap your merged code within a Python code block (i.e., ```python\\n[Your Code H
 '''
 
 CROSS_MEM_USER = '''\
+Adopt the memory-efficient approach from B into A's structure.
+Do not break correctness.
+Return ONLY the merged Python program within a Python code block (i.e., ```python\\n[Your Code Here]\\n```)
+
 # Failed Test Case
 {test_case}
 
@@ -190,10 +199,6 @@ CROSS_MEM_USER = '''\
 
 ## Program B Profile
 {p2_profile}
-
-Adopt the memory-efficient approach from B into A's structure.
-Do not break correctness.
-Return ONLY the merged Python program within a Python code block (i.e., ```python\\n[Your Code Here]\\n```)\
 '''
 
 
@@ -212,6 +217,9 @@ Wrap your corrected code within a Python code block (i.e., ```python\\n[Your Cod
 '''
 
 MUT_FAIL_USER = '''\
+Write the corrected version of the code below.
+Return ONLY the complete Python program within a Python code block (i.e., ```python\\n[Your Code Here]\\n```)
+
 # Problem Description
 {description}
 
@@ -228,9 +236,6 @@ MUT_FAIL_USER = '''\
 ```python
 {code}
 ```
-
-Write the corrected version of the code above.
-Return ONLY the complete Python program within a Python code block (i.e., ```python\\n[Your Code Here]\\n```)\
 '''
 
 
@@ -243,6 +248,9 @@ Wrap your optimized code within a Python code block (i.e., ```python\\n[Your Cod
 '''
 
 MUT_TIME_USER = '''\
+Reduce execution time. Do not break correctness.
+Return ONLY the optimized Python program within a Python code block (i.e., ```python\\n[Your Code Here]\\n```)
+
 # Problem Description
 {description}
 
@@ -259,9 +267,6 @@ MUT_TIME_USER = '''\
 ```python
 {code}
 ```
-
-Reduce execution time. Do not break correctness.
-Return ONLY the optimized Python program within a Python code block (i.e., ```python\\n[Your Code Here]\\n```)\
 '''
 
 
@@ -274,6 +279,9 @@ Wrap your optimized code within a Python code block (i.e., ```python\\n[Your Cod
 '''
 
 MUT_MEM_USER = '''\
+Reduce peak memory usage. Do not break correctness.
+Return ONLY the optimized Python program within a Python code block (i.e., ```python\\n[Your Code Here]\\n```)
+
 # Problem Description
 {description}
 
@@ -290,7 +298,24 @@ MUT_MEM_USER = '''\
 ```python
 {code}
 ```
-
-Reduce peak memory usage. Do not break correctness.
-Return ONLY the optimized Python program within a Python code block (i.e., ```python\\n[Your Code Here]\\n```)\
 '''
+
+
+# ------------------------------------------------------------------ #
+# Prompt type lookup (telemetry, mock backend)                       #
+# ------------------------------------------------------------------ #
+
+PROMPT_TYPES = {
+    PAR_SYSTEM: "PaR",
+    EFFILEARNER_SYSTEM: "EffiLearner",
+    CROSS_FAIL_SYSTEM: "CROSS_FAIL",
+    CROSS_TIME_SYSTEM: "CROSS_TIME",
+    CROSS_MEM_SYSTEM: "CROSS_MEM",
+    MUT_FAIL_SYSTEM: "MUT_FAIL",
+    MUT_TIME_SYSTEM: "MUT_TIME",
+    MUT_MEM_SYSTEM: "MUT_MEM",
+}
+
+
+def prompt_type(system: str) -> str:
+    return PROMPT_TYPES.get(system, "UNKNOWN")
@@ -0,0 +1,50 @@
+import re
+
+
+class CodeBlock:
+    """Incremental scanner for the first fenced code block of a streamed reply.
+
+    feed() is called with each text delta and returns True once the closing
+    fence has arrived; anything the model writes after it is not needed.
+    Only the unfinished last line is rescanned per delta.
+    """
+
+    OPEN = re.compile(r"```[^\n`]*\n")
+    CLOSE = re.compile(r"^```", flags=re.MULTILINE)
+
+    def __init__(self):
+        self.buffer = ""
+        self.complete = False
+        self._open = None  # (fence start, body start)
+        self._close = None  # end of closing fence
+        self._scan = 0
+
+    def feed(self, delta: str | None) -> bool:
+        if self.complete or not delta:
+            return self.complete
+        self.buffer += delta
+        if self._open is None:
+            m = self.OPEN.search(self.buffer, self._scan)
+            if m is None:
+                self._skip_lines()
+                return False
+            self._open = (m.start(), m.end())
+            self._scan = m.end()
+        m = self.CLOSE.search(self.buffer, self._scan)
+        if m is None:
+            self._skip_lines()
+            return False
+        self._close = m.end()
+        self.complete = True
+        return True
+
+    def _skip_lines(self):
+        # A fence lies within one line, so only the last, unfinished line can still match
+        self._scan = max(self.buffer.rfind("\n", self._scan) + 1, self._scan)
+
+    @property
+    def text(self) -> str:
+        """The complete fenced block once closed, otherwise everything received."""
+        if self.complete:
+            return self.buffer[self._open[0]:self._close]
+        return self.buffer
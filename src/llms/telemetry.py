@@ -0,0 +1,153 @@
+from dataclasses import dataclass, field
+
+from .prompts import prompt_type
+from .tokenizer import Tokenizer
+
+
+@dataclass(slots=True)
+class CallRecord:
+    problem:str = field(default="", metadata={"desc":"Problem ID"})
+    buggy:str = field(default="", metadata={"desc":"Buggy program ID"})
+    gen:int = field(default=0, metadata={"desc":"Generation (0 = initial population)"})
+    prompt_type:str = field(default="", metadata={"desc":"PaR / EffiLearner / CROSS_* / MUT_*"})
+    n:int = field(default=1, metadata={"desc":"Choices requested"})
+    outcome:str = field(default="ok", metadata={"desc":"ok / failed / cached"})
+    attempts:int = field(default=0, metadata={"desc":"Requests sent, including retries and hedges"})
+    latency:float = field(default=0.0, metadata={"desc":"Seconds from send to reply of the successful request"})
+    queue_wait:float = field(default=0.0, metadata={"desc":"Seconds spent waiting on rate limits and the concurrency cap"})
+    prompt_tokens:int = field(default=0, metadata={"desc":"Prompt tokens (provider usage, else counted)"})
+    cached_tokens:int = field(default=0, metadata={"desc":"Prompt tokens served from the provider's prefix cache"})
+    completion_tokens:int = field(default=0, metadata={"desc":"Completion tokens (provider usage, else counted)"})
+    empty:int = field(default=0, metadata={"desc":"Choices without usable content"})
+    discarded:int = field(default=0, metadata={"desc":"Choices rejected by the syntax check"})
+    cost:float = field(default=0.0, metadata={"desc":"Estimated cost in USD"})
+
+
+class Telemetry:
+    """Per-call LLM telemetry, tagged with the problem / buggy / generation being repaired.
+
+    Approaches call tag() as they move between buggies and generations;
+    Models appends one CallRecord per request (and one per batch of cache
+    hits). Outputs are linked to their record so that a later syntax-check
+    rejection can be charged back to the call that produced it.
+    """
+
+    # USD per 1M (prompt, completion, cached prompt) tokens; the longest matching prefix wins
+    PRICES = {
+        "gpt-3.5-turbo": (0.50, 1.50, 0.50),
+        "gpt-4": (30.00, 60.00, 30.00),
+        "gpt-4-turbo": (10.00, 30.00, 10.00),
+        "gpt-4o": (2.50, 10.00, 1.25),
+        "gpt-4o-mini": (0.15, 0.60, 0.075),
+        "gpt-4.1": (2.00, 8.00, 0.50),
+        "gpt-4.1-mini": (0.40, 1.60, 0.10),
+        "gpt-4.1-nano": (0.10, 0.40, 0.025),
+        "gpt-5": (1.25, 10.00, 0.125),
+        "gpt-5-mini": (0.25, 2.00, 0.025),
+        "gpt-5-nano": (0.05, 0.40, 0.005),
+    }
+
+    context = {"problem": "", "buggy": "", "gen": 0}
+    records = []
+    _by_output = {}
+
+    @classmethod
+    def reset(cls):
+        cls.records = []
+        cls._by_output = {}
+
+    @classmethod
+    def tag(cls, **context):
+        cls.context = {**cls.context, **context}
+
+    @classmethod
+    def price(cls, model:str) -> tuple[float, float, float]:
+        matches = [k for k in cls.PRICES if model.startswith(k)]
+        return cls.PRICES[max(matches, key=len)] if matches else (0.0, 0.0, 0.0)
+
+    @classmethod
+    def record(
+        cls, model:str, system:str, user:str, n:int,
+        contents:list|None, trace:dict, usage:dict|None=None,
+    ) -> CallRecord:
+        usage = usage or {}
+        prompt_tokens = usage.get("prompt_tokens")
+        if prompt_tokens is None:
+            prompt_tokens = sum(Tokenizer.count_many([system, user]))
+        completion_tokens = usage.get("completion_tokens")
+        if completion_tokens is None:
+            completion_tokens = sum(Tokenizer.count_many([c for c in contents or [] if c]))
+        cached_tokens = min(usage.get("cached_tokens") or 0, prompt_tokens)
+        # A failed call is only charged for the tokens the provider reported billing (usually none)
+        failed = contents is None
+        billed_prompt = (usage.get("prompt_tokens") or 0) if failed else prompt_tokens
+        billed_completion = (usage.get("completion_tokens") or 0) if failed else completion_tokens
+        billed_cached = min(cached_tokens, billed_prompt)
+        p_in, p_out, p_cached = cls.price(model)
+        record = CallRecord(
+            **cls.context,
+            prompt_type=prompt_type(system),
+            n=n,
+            outcome="failed" if failed else "ok",
+            attempts=trace.get("attempts", 0),
+            latency=trace.get("latency", 0.0),
+            queue_wait=trace.get("queue", 0.0),
+            prompt_tokens=prompt_tokens,
+            cached_tokens=cached_tokens,
+            completion_tokens=completion_tokens,
+            empty=n if failed else n - sum(1 for c in contents if c),
+            cost=((billed_prompt - billed_cached) * p_in + billed_cached * p_cached
+                  + billed_completion * p_out) / 1e6,
+        )
+        cls.records.append(record)
+        return record
+
+    @classmethod
+    def record_cached(cls, system:str, n:int) -> CallRecord:
+        record = CallRecord(**cls.context, prompt_type=prompt_type(system), n=n, outcome="cached")
+        cls.records.append(record)
+        return record
+
+    @classmethod
+    def link(cls, record:CallRecord, outputs:list):
+        for output in outputs:
+            if output:
+                cls._by_output[output] = record
+
+    @classmethod
+    def discard(cls, code:str):
+        """Charge a syntax-check rejection of *code* to the call that produced it."""
+        record = cls._by_output.get(code)
+        if record is not None:
+            record.discarded += 1
+
+    @classmethod
+    def aggregate(cls) -> list[dict]:
+        """Totals per (problem, buggy, gen, prompt type), in first-seen order."""
+        groups = {}
+        for r in cls.records:
+            key = (r.problem, r.buggy, r.gen, r.prompt_type)
+            g = groups.setdefault(key, {
+                "calls": 0, "cached": 0, "failed": 0, "attempts": 0,
+                "samples": 0, "empty": 0, "discarded": 0,
+                "latency": 0.0, "latency_max": 0.0, "queue_wait": 0.0,
+                "prompt_tokens": 0, "cached_tokens": 0, "completion_tokens": 0, "cost": 0.0,
+            })
+            g["calls"] += r.outcome != "cached"
+            g["cached"] += r.n if r.outcome == "cached" else 0
+            g["failed"] += r.outcome == "failed"
+            g["attempts"] += r.attempts
+            g["samples"] += r.n
+            g["empty"] += r.empty
+            g["discarded"] += r.discarded
+            g["latency"] += r.latency
+            g["latency_max"] = max(g["latency_max"], r.latency)
+            g["queue_wait"] += r.queue_wait
+            g["prompt_tokens"] += r.prompt_tokens
+            g["cached_tokens"] += r.cached_tokens
+            g["completion_tokens"] += r.completion_tokens
+            g["cost"] += r.cost
+        return [
+            {"problem": k[0], "buggy": k[1], "gen": k[2], "prompt_type": k[3], **g}
+            for k, g in groups.items()
+        ]
@@ -1,20 +1,139 @@
-from transformers import AutoTokenizer
+import hashlib
+import warnings
+from collections import OrderedDict
+
 
 class Tokenizer:
+    """Token counting for the configured model.
+
+    OpenAI models use tiktoken; any other model loads its HuggingFace
+    tokenizer on first use. When neither can be loaded (e.g. offline),
+    counts fall back to ~4 characters per token. Counts are memoised in
+    an LRU keyed by a digest of the text, so re-counting the same prompt
+    parts across a run costs one hash.
+    """
+
+    OPENAI_PREFIXES = ("gpt-", "o1", "o3", "o4", "chatgpt-", "text-embedding-")
+
+    model_name = None
+    tokenizer = None
+    cache_size = 65536
+    hits = 0
+    misses = 0
+    _backend = None  # "tiktoken" | "hf" | "estimate"
+    _cache = OrderedDict()
+
     @classmethod
-    def set(cls, model_name:str):
-        cls.tokenizer = AutoTokenizer.from_pretrained(model_name, use_fast=True)
-        
+    def set(cls, model_name:str|None, cache_size:int=65536):
+        cls.model_name = model_name
+        cls.tokenizer = None
+        cls._backend = None
+        cls.cache_size = cache_size
+        cls._cache = OrderedDict()
+        cls.hits = cls.misses = 0
+
     @classmethod
-    def parse(cls, text:str) -> list[int]:
-        tokens = cls.tokenizer.tokenize(text)
-        return tokens
-    
+    def _load(cls):
+        if cls._backend is not None:
+            return
+        cls._backend = "estimate"
+        if cls.model_name is None:
+            return
+        try:
+            if cls.model_name.startswith(cls.OPENAI_PREFIXES):
+                import tiktoken
+                try:
+                    cls.tokenizer = tiktoken.encoding_for_model(cls.model_name)
+                except KeyError:
+                    # Newer models not yet in tiktoken's table
+                    cls.tokenizer = tiktoken.get_encoding("o200k_base")
+                cls._backend = "tiktoken"
+            else:
+                from transformers import AutoTokenizer
+                cls.tokenizer = AutoTokenizer.from_pretrained(cls.model_name, use_fast=True)
+                cls._backend = "hf"
+        except Exception as e:
+            warnings.warn(f"No tokenizer for {cls.model_name} ({e}); estimating tokens from length")
+            cls.tokenizer = None
+
+    @classmethod
+    def parse(cls, text:str) -> list[str]:
+        cls._load()
+        if cls._backend == "tiktoken":
+            return [cls.tokenizer.decode([t]) for t in cls.tokenizer.encode_ordinary(text)]
+        if cls._backend == "hf":
+            return cls.tokenizer.tokenize(text)
+        return text.split()
+
     @classmethod
     def encode(cls, text:str) -> list[int]:
-        input_ids = cls.tokenizer.encode(text)
-        return input_ids
-    
+        cls._load()
+        if cls._backend == "tiktoken":
+            return cls.tokenizer.encode_ordinary(text)
+        if cls._backend == "hf":
+            return cls.tokenizer.encode(text)
+        raise RuntimeError(f"No tokenizer loaded for {cls.model_name}")
+
     @classmethod
     def length(cls, text:str) -> int:
-        return len(cls.encode(text))
\ No newline at end of file
+        return cls.count(text)
+
+    @staticmethod
+    def _key(text:str) -> bytes:
+        return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+    @classmethod
+    def _encode_batch(cls, texts:list[str]) -> list[int]:
+        if cls._backend == "tiktoken":
+            return [len(ids) for ids in cls.tokenizer.encode_ordinary_batch(texts)]
+        if cls._backend == "hf":
+            return [len(ids) for ids in cls.tokenizer(texts)["input_ids"]]
+        return [len(text) // 4 + 1 for text in texts]
+
+    @classmethod
+    def _remember(cls, key:bytes, count:int):
+        cls._cache[key] = count
+        if len(cls._cache) > cls.cache_size:
+            cls._cache.popitem(last=False)
+
+    @classmethod
+    def count(cls, text:str) -> int:
+        if not text:
+            return 0
+        key = cls._key(text)
+        count = cls._cache.get(key)
+        if count is not None:
+            cls.hits += 1
+            cls._cache.move_to_end(key)
+            return count
+        cls.misses += 1
+        cls._load()
+        count = cls._encode_batch([text])[0]
+        cls._remember(key, count)
+        return count
+
+    @classmethod
+    def count_many(cls, texts:list[str]) -> list[int]:
+        """Counts for many texts; cache misses are encoded in one batch call."""
+        keys = [cls._key(text) if text else None for text in texts]
+        counts = [0] * len(texts)
+        missing = {}
+        for i, key in enumerate(keys):
+            if key is None:
+                continue
+            count = cls._cache.get(key)
+            if count is None:
+                missing.setdefault(key, []).append(i)
+                continue
+            cls.hits += 1
+            cls._cache.move_to_end(key)
+            counts[i] = count
+        if missing:
+            cls.misses += len(missing)
+            cls._load()
+            batch = [texts[indices[0]] for indices in missing.values()]
+            for (key, indices), count in zip(missing.items(), cls._encode_batch(batch)):
+                cls._remember(key, count)
+                for i in indices:
+                    counts[i] = count
+        return counts
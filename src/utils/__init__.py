@@ -1,3 +1,4 @@
 from .randoms import Randoms
 from .etc import ETC
+from .store import DatasetStore
 from .loader import Loader
\ No newline at end of file
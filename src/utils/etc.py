@@ -1,3 +1,6 @@
+import math
+
+
 class ETC:
     @staticmethod
     def calc_lcs(lst_a, lst_b) -> int:
@@ -28,3 +31,12 @@ class ETC:
         # One-line normalization to ignore formatting-only differences
         # (spaces, tabs, newlines) across generated variants.
         return "".join(ETC.normalize_lines(code))
+
+    @staticmethod
+    def percentile(values, q: float) -> float:
+        # Nearest-rank percentile, q in [0, 100]; 0 for an empty sequence
+        if not values:
+            return 0.0
+        ordered = sorted(values)
+        rank = max(math.ceil(q * len(ordered) / 100), 1)
+        return ordered[min(rank, len(ordered)) - 1]
@@ -1,6 +1,5 @@
-import json
-
 from .sampling import Sampling
+from .store import DatasetStore
 from ..execution import Programs, Program, TestCases
 
 class Loader:
@@ -9,24 +8,20 @@ class Loader:
         self.initialization = initialization
     
     def run(self, problem:str) -> tuple[str, str, int, int, Programs, Programs, TestCases]:
-        dataset = json.loads(open(problem, 'r').read())
-        assignment = dataset['assignment']
+        references, buggys = Programs(), Programs()
+        with DatasetStore(problem) as store:
+            assignment = store.assignment
+            testcases = TestCases(store.test_cases())
+            for sub in store.submissions():
+                if sub["status"] == "OK": 
+                    references.append(Program(
+                        id=sub["id"], code=sub["code"], ext=sub["ext"]))
+                else:
+                    buggys.append(Program(
+                        id=sub["id"], code=sub["code"], ext=sub["ext"],
+                        meta={"verdict": sub["status"]}))
         timelimit = int(assignment['time_limit'])
         memlimit = int(assignment['memory_limit'])
-
-        submissions = dataset['submissions']
-        mismatches = dataset.get('mismatches', [])
-        references, buggys = Programs(), Programs()
-        
-        for sub in submissions:
-            if sub["id"] in mismatches: continue
-            if sub["status"] == "OK": 
-                references.append(Program(
-                    id=sub["id"], code=sub["code"], ext=sub["ext"]))
-            else:
-                buggys.append(Program(
-                    id=sub["id"], code=sub["code"], ext=sub["ext"],
-                    meta={"verdict": sub["status"]}))
         
         if self.sampling:
             sampler = Sampling(list(buggys))
@@ -36,8 +31,6 @@ class Loader:
         
         if self.initialization:
             references = Programs()
-        
-        testcases = TestCases(dataset['test_cases'])
 
 
         return assignment, timelimit, memlimit, buggys, references, testcases
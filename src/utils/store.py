@@ -0,0 +1,206 @@
+import errno
+import glob
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import zlib
+from collections.abc import Iterable, Iterator
+from urllib.request import pathname2url
+
+
+class DatasetStore:
+    """Per-problem dataset container: one SQLite file plus a directory of test-input blobs.
+
+    The assignment, test cases, submissions (zlib-compressed code) and
+    mismatches live in `dataset.db`, so loaders query what they need
+    instead of parsing the whole problem, and verification updates the
+    mismatches in place. Test inputs of BLOB_BYTES or more are stored as
+    raw UTF-8 files under `blobs/`, named by their content digest; they
+    are handed to the runner as files and memory-mapped when rendered.
+    Legacy `dataset.json` problems are still read, and convert() imports
+    them.
+    """
+
+    FILENAME = "dataset.db"
+    LEGACY = "dataset.json"
+    BLOBS = "blobs"
+    BLOB_BYTES = 64 << 10
+
+    SCHEMA = """
+        CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+        CREATE TABLE test_cases (id INTEGER PRIMARY KEY, input TEXT, input_file TEXT, output TEXT NOT NULL);
+        CREATE TABLE submissions (id TEXT NOT NULL, status TEXT NOT NULL, ext TEXT NOT NULL, code BLOB NOT NULL);
+        CREATE TABLE mismatches (id TEXT PRIMARY KEY);
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.directory = os.path.dirname(os.path.abspath(path))
+        self.legacy = path.endswith(".json")
+        self._json = None
+        self._db = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    @property
+    def db(self) -> sqlite3.Connection:
+        """Connection to an existing dataset.db; a missing file raises instead of being created empty."""
+        if self._db is None:
+            if not os.path.isfile(self.path):
+                raise FileNotFoundError(errno.ENOENT, os.strerror(errno.ENOENT), self.path)
+            self._db = sqlite3.connect(f"file:{pathname2url(os.path.abspath(self.path))}?mode=rw", uri=True)
+        return self._db
+
+    @property
+    def dataset(self) -> dict:
+        """Parsed legacy dataset.json."""
+        if self._json is None:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self._json = json.load(f)
+        return self._json
+
+    # ------------------------------------------------------------------ #
+    # Reading                                                            #
+    # ------------------------------------------------------------------ #
+
+    @property
+    def assignment(self) -> dict:
+        if self.legacy:
+            return self.dataset["assignment"]
+        (value,) = self.db.execute("SELECT value FROM meta WHERE key = 'assignment'").fetchone()
+        return json.loads(value)
+
+    def mismatches(self) -> set[str]:
+        if self.legacy:
+            return set(self.dataset.get("mismatches", []))
+        return {id for (id,) in self.db.execute("SELECT id FROM mismatches")}
+
+    def test_cases(self) -> list[dict]:
+        """Test cases in id order; an externalized input has an empty `input` and an absolute `input_file`."""
+        if self.legacy:
+            return self.dataset["test_cases"]
+        rows = self.db.execute("SELECT id, input, input_file, output FROM test_cases ORDER BY id")
+        return [
+            {"id": id, "output": output, "input": input or "",
+             "input_file": os.path.join(self.directory, self.BLOBS, input_file) if input_file else None}
+            for id, input, input_file, output in rows
+        ]
+
+    def submissions(self, skip_mismatches: bool = True) -> Iterator[dict]:
+        """Submissions in dataset order, decompressed one at a time."""
+        if self.legacy:
+            mismatches = self.mismatches() if skip_mismatches else set()
+            yield from (s for s in self.dataset["submissions"] if s["id"] not in mismatches)
+            return
+        query = "SELECT id, status, ext, code FROM submissions"
+        if skip_mismatches:
+            query += " WHERE id NOT IN (SELECT id FROM mismatches)"
+        for id, status, ext, code in self.db.execute(query + " ORDER BY rowid"):
+            yield {"id": id, "status": status, "ext": ext, "code": zlib.decompress(code).decode("utf-8")}
+
+    def add_mismatches(self, ids: Iterable[str]):
+        if self.legacy:
+            dataset = self.dataset
+            dataset["mismatches"] = list(set(dataset.get("mismatches", [])) | set(ids))
+            with open(self.path, "w") as f:
+                json.dump(dataset, f, indent=4)
+            return
+        with self.db:
+            self.db.executemany("INSERT OR IGNORE INTO mismatches (id) VALUES (?)", ((id,) for id in ids))
+
+    # ------------------------------------------------------------------ #
+    # Writing                                                            #
+    # ------------------------------------------------------------------ #
+
+    @classmethod
+    def _blob(cls, directory: str, text: str) -> str:
+        data = text.encode("utf-8")
+        name = hashlib.blake2b(data, digest_size=16).hexdigest()
+        path = os.path.join(directory, cls.BLOBS, name)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        return name
+
+    @classmethod
+    def write(
+        cls,
+        path: str,
+        assignment: dict,
+        submissions: Iterable[dict],
+        test_cases: list[dict],
+        mismatches: Iterable[str] = (),
+    ):
+        """Write a problem to *path*, streaming *submissions* one at a time.
+
+        The file is built next to *path* and swapped in once complete.
+        """
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        db = sqlite3.connect(tmp)
+        try:
+            with db:
+                db.executescript(cls.SCHEMA)
+                db.execute("INSERT INTO meta VALUES ('assignment', ?)",
+                           (json.dumps(assignment, ensure_ascii=False),))
+                for tc in test_cases:
+                    text = tc.get("input", "")
+                    if len(text.encode("utf-8")) >= cls.BLOB_BYTES:
+                        row = (tc["id"], None, cls._blob(directory, text), tc.get("output", ""))
+                    else:
+                        row = (tc["id"], text, None, tc.get("output", ""))
+                    db.execute("INSERT INTO test_cases VALUES (?, ?, ?, ?)", row)
+                db.executemany(
+                    "INSERT INTO submissions VALUES (?, ?, ?, ?)",
+                    ((s["id"], s["status"], s["ext"], zlib.compress(s["code"].encode("utf-8")))
+                     for s in submissions))
+                db.executemany("INSERT OR IGNORE INTO mismatches VALUES (?)", ((id,) for id in mismatches))
+        finally:
+            db.close()
+        os.replace(tmp, path)
+
+    @classmethod
+    def convert(cls, json_path: str) -> str:
+        """Import a legacy dataset.json into a dataset.db next to it; returns the new path."""
+        legacy = cls(json_path)
+        path = os.path.join(legacy.directory, cls.FILENAME)
+        cls.write(path, legacy.assignment, legacy.submissions(skip_mismatches=False),
+                  legacy.test_cases(), legacy.mismatches())
+        return path
+
+    @classmethod
+    def remove(cls, directory: str):
+        """Delete a problem's files (either format) and its input blobs from *directory*."""
+        for name in (cls.FILENAME, cls.LEGACY):
+            path = os.path.join(directory, name)
+            if os.path.exists(path):
+                os.remove(path)
+        shutil.rmtree(os.path.join(directory, cls.BLOBS), ignore_errors=True)
+
+    @classmethod
+    def find(cls, root: str) -> list[str]:
+        """Problem files under *root*, sorted; a dataset.db shadows the JSON files next to it."""
+        stores = glob.glob(os.path.join(root, "**", cls.FILENAME), recursive=True)
+        converted = {os.path.dirname(path) for path in stores}
+        legacy = [
+            path for path in glob.glob(os.path.join(root, "**", "*.json"), recursive=True)
+            if os.path.dirname(path) not in converted
+        ]
+        return sorted(stores + legacy)